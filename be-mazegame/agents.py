@@ -0,0 +1,62 @@
+from game_state import Inputs, SHIFT, UP, DOWN, LEFT, RIGHT
+
+DIRECTIONS = (UP, DOWN, LEFT, RIGHT)
+
+
+class RandomAgent:
+    """随机游走：每步随机选一个方向；死角挑战期间以 shift_rate 的概率按 Shift"""
+
+    def __init__(self, rng, shift_rate=0.5):
+        self.rng = rng
+        self.shift_rate = shift_rate
+
+    def act(self, state):
+        actions = ()
+        if state.shift_challenge_active and self.rng.random() < self.shift_rate:
+            actions = (SHIFT,)
+        return Inputs(self.rng.choice(DIRECTIONS), actions)
+
+
+class GreedyAgent:
+    """按脚本通关：先沿最短路去最近的小球，集齐 4 个后去终点；挑战期间每步按 Shift"""
+
+    def __init__(self, rng=None):
+        self.rng = rng
+        self.target = None
+        self.route = []
+
+    def choose_target(self, state):
+        px, py = state.player.get_pos()
+        if len(state.player.collected) >= 4:
+            return state.end
+        nearby = state.balls.in_rect(px - 3, py - 3, px + 3, py + 3)
+        candidates = [cell for cell, _ in nearby] or state.balls.cells()
+        if not candidates:
+            return state.end
+        return min(candidates, key=lambda c: abs(c[0] - px) + abs(c[1] - py))
+
+    def act(self, state):
+        actions = (SHIFT,) if state.shift_challenge_active else ()
+        pos = state.player.get_pos()
+        stale = self.target is None or pos == self.target or not self.route
+        if not stale and self.target != state.end and self.target not in state.balls:
+            stale = True
+        if stale:
+            self.target = self.choose_target(state)
+            self.route = (state.find_route(pos, self.target) or [pos])[1:]
+        while self.route and self.route[0] == pos:
+            self.route.pop(0)
+        if not self.route:
+            return Inputs(None, actions)
+        dx, dy = self.route[0][0] - pos[0], self.route[0][1] - pos[1]
+        if abs(dx) + abs(dy) != 1:
+            # 偏离了路线（例如迷宫滚动），下一步重新规划
+            self.target = None
+            return Inputs(None, actions)
+        return Inputs((dx, dy), actions)
+
+
+AGENTS = {
+    "random": RandomAgent,
+    "greedy": GreedyAgent,
+}
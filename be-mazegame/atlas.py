@@ -0,0 +1,107 @@
+import pygame
+
+
+def is_opaque(surface):
+    """表面是否完全不透明（没有 alpha 通道，或所有像素 alpha 都是 255）"""
+    if not surface.get_flags() & pygame.SRCALPHA and surface.get_colorkey() is None:
+        return True
+    w, h = surface.get_size()
+    return pygame.mask.from_surface(surface, 254).count() == w * h
+
+
+class SpriteHandle:
+    """图集中的一个子区域：rect 为在图集上的位置，image 为共享图集像素的子表面"""
+
+    __slots__ = ("atlas", "rect", "image")
+
+    def __init__(self, atlas, rect):
+        self.atlas = atlas
+        self.rect = rect
+        self.image = atlas.subsurface(rect)
+
+    @property
+    def size(self):
+        return self.rect.size
+
+    def blit(self, dest, pos):
+        return dest.blit(self.atlas, pos, self.rect)
+
+
+class TextureAtlas:
+    """把多张精灵按行（shelf）打包进一张已转换为显示格式的大表面
+
+    完全不透明的精灵放进 convert() 的图集，带透明像素的放进 convert_alpha() 的图集，
+    每张精灵只在打包时转换一次像素格式，之后所有 blit 都不再需要格式转换。
+    """
+
+    def __init__(self, max_width=1024):
+        self.max_width = max_width
+        self.sources = {}
+        self.handles = {}
+        self.surfaces = []
+
+    def add(self, name, surface):
+        """加入或替换一张精灵，下次 build 时生效；surface 为 None 时移除"""
+        if surface is None:
+            self.sources.pop(name, None)
+        else:
+            self.sources[name] = surface
+        self.handles = {}
+
+    def get(self, name):
+        """名字对应的 SpriteHandle，没有则返回 None"""
+        return self.handles.get(name)
+
+    def image(self, name):
+        """名字对应的子表面，没有则返回 None"""
+        handle = self.handles.get(name)
+        return handle.image if handle else None
+
+    def __contains__(self, name):
+        return name in self.handles
+
+    def build(self):
+        """重新打包所有精灵，返回 {name: SpriteHandle}"""
+        opaque, alpha = {}, {}
+        for name, surface in self.sources.items():
+            (opaque if is_opaque(surface) else alpha)[name] = surface
+        self.handles = {}
+        self.surfaces = []
+        for group, transparent in ((opaque, False), (alpha, True)):
+            if group:
+                self._pack(group, transparent)
+        return self.handles
+
+    def _layout(self, group):
+        """按高度从大到小逐行摆放，返回每张精灵的位置和图集尺寸"""
+        widest = max(s.get_width() for s in group.values())
+        limit = max(self.max_width, widest)
+        order = sorted(group, key=lambda n: (-group[n].get_height(), n))
+        positions = {}
+        x = y = shelf = width = 0
+        for name in order:
+            w, h = group[name].get_size()
+            if x + w > limit:
+                y += shelf
+                x = shelf = 0
+            positions[name] = (x, y)
+            x += w
+            shelf = max(shelf, h)
+            width = max(width, x)
+        return positions, (width, y + shelf)
+
+    def _pack(self, group, transparent):
+        positions, size = self._layout(group)
+        if transparent:
+            atlas = pygame.Surface(size, pygame.SRCALPHA).convert_alpha()
+            atlas.fill((0, 0, 0, 0))
+            for name, pos in positions.items():
+                # 目标全透明，取最大值相当于原样复制像素（包括 alpha）
+                atlas.blit(group[name], pos, special_flags=pygame.BLEND_RGBA_MAX)
+        else:
+            atlas = pygame.Surface(size).convert()
+            for name, pos in positions.items():
+                atlas.blit(group[name], pos)
+        self.surfaces.append(atlas)
+        for name, pos in positions.items():
+            self.handles[name] = SpriteHandle(atlas, pygame.Rect(pos, group[name].get_size()))
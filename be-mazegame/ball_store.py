@@ -0,0 +1,142 @@
+from array import array
+
+# changes() 最多记录这么多个格子，超过后让调用方整体重画
+CHANGE_LIMIT = 256
+
+
+class BallStore:
+    """按格子索引的小球存储：坐标和数字分列存放（结构数组），另有一张格子到槽位的表
+
+    按格子拾取、查询都是 O(1)，删除时与末尾交换；区域查询按区域面积和球数择优遍历。
+    迭代时产出 ((x, y), num)，与旧的列表格式兼容。
+    """
+
+    def __init__(self, width, height, balls=()):
+        self.width = width
+        self.height = height
+        self.xs = array("i")
+        self.ys = array("i")
+        self.nums = array("b")
+        # slot[y*width+x] 为槽位号加一，0 表示没有球
+        self.slot = array("i", [0]) * (width * height)
+        # 每次增删都会加一，供缓存判断小球是否有变化
+        self.version = 0
+        # 自上次 changes() 以来增删过小球的格子，供小地图只重画变化的点；None 表示要整体重画
+        self._changed = None
+        self.extend(balls)
+
+    def __len__(self):
+        return len(self.nums)
+
+    def __iter__(self):
+        return iter([((x, y), n) for x, y, n in zip(self.xs, self.ys, self.nums)])
+
+    def __contains__(self, cell):
+        x, y = cell
+        return 0 <= x < self.width and 0 <= y < self.height and self.slot[y*self.width + x] != 0
+
+    def number_at(self, x, y):
+        """格子上小球的数字，没有球返回 None"""
+        s = self.slot[y*self.width + x]
+        return self.nums[s - 1] if s else None
+
+    def _touch(self, x, y):
+        changed = self._changed
+        if changed is not None:
+            changed.add((x, y))
+            if len(changed) > CHANGE_LIMIT:
+                # 变化太多（例如一次铺满小球），整体重画比逐个重画更快
+                self._changed = None
+
+    def changes(self):
+        """自上次调用以来增删过小球的格子集合；变化太多或第一次调用时返回 None，应整体重画"""
+        changed = self._changed
+        self._changed = set()
+        return changed
+
+    def add(self, x, y, num):
+        """放置一个小球，格子上已有球时覆盖其数字"""
+        i = y*self.width + x
+        s = self.slot[i]
+        self.version += 1
+        self._touch(x, y)
+        if s:
+            self.nums[s - 1] = num
+            return
+        self.xs.append(x)
+        self.ys.append(y)
+        self.nums.append(num)
+        self.slot[i] = len(self.nums)
+
+    def extend(self, balls):
+        for (x, y), num in balls:
+            self.add(x, y, num)
+
+    def fill(self, cells, numbers):
+        """批量放球：cells 与 numbers 一一对应"""
+        for (x, y), num in zip(cells, numbers):
+            self.add(x, y, num)
+
+    def take(self, x, y):
+        """拾取格子上的小球，返回数字；没有球返回 None"""
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        i = y*self.width + x
+        s = self.slot[i]
+        if not s:
+            return None
+        self.version += 1
+        self._touch(x, y)
+        self.slot[i] = 0
+        num = self.nums[s - 1]
+        last = len(self.nums) - 1
+        if s - 1 < last:
+            lx, ly = self.xs[last], self.ys[last]
+            self.xs[s - 1] = lx
+            self.ys[s - 1] = ly
+            self.nums[s - 1] = self.nums[last]
+            self.slot[ly*self.width + lx] = s
+        self.xs.pop()
+        self.ys.pop()
+        self.nums.pop()
+        return num
+
+    def cells(self):
+        return list(zip(self.xs, self.ys))
+
+    def numbers(self):
+        return list(self.nums)
+
+    def clear(self):
+        """清空所有小球"""
+        self.version += 1
+        self._changed = None
+        if len(self.nums) * 8 > len(self.slot):
+            self.slot = array("i", [0]) * len(self.slot)
+        else:
+            w = self.width
+            for x, y in zip(self.xs, self.ys):
+                self.slot[y*w + x] = 0
+        self.xs = array("i")
+        self.ys = array("i")
+        self.nums = array("b")
+
+    def in_rect(self, x0, y0, x1, y1):
+        """区域 [x0, x1] x [y0, y1]（含边界）内的小球列表"""
+        x0, y0 = max(x0, 0), max(y0, 0)
+        x1, y1 = min(x1, self.width - 1), min(y1, self.height - 1)
+        if x0 > x1 or y0 > y1:
+            return []
+        if (x1 - x0 + 1) * (y1 - y0 + 1) < len(self.nums):
+            # 区域比球数小：逐格查表
+            w, slot, nums = self.width, self.slot, self.nums
+            result = []
+            for y in range(y0, y1 + 1):
+                row = y * w
+                for x in range(x0, x1 + 1):
+                    s = slot[row + x]
+                    if s:
+                        result.append(((x, y), nums[s - 1]))
+            return result
+        return [((x, y), n) for x, y, n in zip(self.xs, self.ys, self.nums)
+                if x0 <= x <= x1 and y0 <= y <= y1]
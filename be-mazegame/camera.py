@@ -0,0 +1,52 @@
+from settings import VIEW_WIDTH, VIEW_HEIGHT, CAMERA_MARGIN
+
+
+class Camera:
+    """视口：显示迷宫中从 (x, y) 起 width×height 格的区域
+
+    玩家离视口边缘少于 margin 格时镜头按整格跟随，迷宫比视口小的方向上固定在 0。
+    """
+
+    def __init__(self, width=VIEW_WIDTH, height=VIEW_HEIGHT, margin=CAMERA_MARGIN):
+        self.width = width
+        self.height = height
+        self.margin = margin
+        self.x = 0
+        self.y = 0
+        # 当前迷宫尺寸，由 follow/center 更新
+        self.maze_width = width
+        self.maze_height = height
+
+    def _clamp(self, origin, view, size):
+        return max(0, min(origin, size - view))
+
+    def _follow_axis(self, origin, pos, view, size):
+        margin = min(self.margin, (view - 1) // 2)
+        if pos < origin + margin:
+            origin = pos - margin
+        elif pos > origin + view - 1 - margin:
+            origin = pos - (view - 1 - margin)
+        return self._clamp(origin, view, size)
+
+    def follow(self, px, py, maze):
+        """让玩家 (px, py) 保持在边距以内，镜头移动时返回 True"""
+        self.maze_width, self.maze_height = maze.width, maze.height
+        x = self._follow_axis(self.x, px, self.width, maze.width)
+        y = self._follow_axis(self.y, py, self.height, maze.height)
+        moved = (x, y) != (self.x, self.y)
+        self.x, self.y = x, y
+        return moved
+
+    def center(self, px, py, maze):
+        """镜头直接对准玩家（换关或迷宫滚动后）"""
+        self.maze_width, self.maze_height = maze.width, maze.height
+        self.x = self._clamp(px - self.width // 2, self.width, maze.width)
+        self.y = self._clamp(py - self.height // 2, self.height, maze.height)
+
+    def bounds(self):
+        """视口内迷宫格子的范围 (x0, y0, x1, y1)，含两端"""
+        return (self.x, self.y, min(self.x + self.width, self.maze_width) - 1,
+                min(self.y + self.height, self.maze_height) - 1)
+
+    def contains(self, x, y):
+        return self.x <= x < self.x + self.width and self.y <= y < self.y + self.height
@@ -0,0 +1,67 @@
+class FreeCellSampler:
+    """空闲格采样器：数组 + 位置到槽位的映射，删除时与末尾交换
+
+    随机抽取、占用（reserve）、释放（release）都是 O(1)。
+    """
+
+    __slots__ = ("cells", "slot")
+
+    def __init__(self, cells=()):
+        self.cells = list(dict.fromkeys(cells))
+        self.slot = {cell: i for i, cell in enumerate(self.cells)}
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __contains__(self, cell):
+        return cell in self.slot
+
+    def __iter__(self):
+        return iter(self.cells)
+
+    def reserve(self, cell):
+        """把格子标记为已占用，原本空闲返回 True"""
+        i = self.slot.pop(cell, None)
+        if i is None:
+            return False
+        last = self.cells.pop()
+        if i < len(self.cells):
+            self.cells[i] = last
+            self.slot[last] = i
+        return True
+
+    def release(self, cell):
+        """把格子放回空闲集合，原本已空闲返回 False"""
+        if cell in self.slot:
+            return False
+        self.slot[cell] = len(self.cells)
+        self.cells.append(cell)
+        return True
+
+    def extend(self, cells):
+        """批量加入空闲格，已空闲的跳过"""
+        slot, free = self.slot, self.cells
+        for cell in cells:
+            if cell not in slot:
+                slot[cell] = len(free)
+                free.append(cell)
+
+    def sample(self, rng):
+        """随机取一个空闲格（不占用），没有空闲格返回 None"""
+        if not self.cells:
+            return None
+        return self.cells[rng.randrange(len(self.cells))]
+
+    def take(self, rng):
+        """随机取一个空闲格并占用它"""
+        cell = self.sample(rng)
+        if cell is not None:
+            self.reserve(cell)
+        return cell
+
+    def take_all(self):
+        """占用全部空闲格并返回它们"""
+        cells = self.cells
+        self.cells = []
+        self.slot = {}
+        return cells
@@ -0,0 +1,425 @@
+import random
+
+from maze_grid import PATH
+from maze_stream import StreamingMaze
+from pathfinding import find_path
+from maze_tree import build_tree_index
+from maze_topology import TopologyIndex
+from cell_sampler import FreeCellSampler
+from ball_store import BallStore
+from visibility import VisibilityMask
+from level import get_path_cells
+from level_pipeline import LevelPipeline, SYNC
+from profiler import profiler
+from settings import (
+    MAZE_WIDTH, MAZE_HEIGHT, MIN_PATH_LENGTH, ENDLESS_SCROLL_MARGIN, VISION_RADIUS, VISION_SHADOWCAST,
+    MOVE_COOLDOWN, BALL_PICKUP_REFRESH_INTERVAL, SHIFT_CHALLENGE_TIME, SHIFT_CHALLENGE_PRESSES,
+)
+
+# 一步之内的离散操作（对应按键按下）
+SHIFT = "shift"              # 死角挑战计数
+LEVEL_UP = "level_up"        # L 键
+LEVEL_DOWN = "level_down"    # R 键
+TOGGLE_FOG = "fog"           # F 键
+TOGGLE_GHOST = "ghost"       # G 键
+COLLECT_ALL = "collect_all"  # O 键
+TOGGLE_HINT = "hint"         # H 键
+QUIT = "quit"
+
+# 方向
+UP, DOWN, LEFT, RIGHT = (0, -1), (0, 1), (-1, 0), (1, 0)
+
+
+def _silent(message):
+    pass
+
+
+class Inputs:
+    """一步的输入：move 为按住的方向 (dx, dy) 或 None，actions 为本步按下的操作列表"""
+
+    __slots__ = ("move", "actions")
+
+    def __init__(self, move=None, actions=()):
+        self.move = move
+        self.actions = actions
+
+
+class Rules:
+    """可调的规则参数，默认取 settings 中的值；批量模拟时按运行覆盖"""
+
+    def __init__(self, width=MAZE_WIDTH, height=MAZE_HEIGHT, min_path_length=MIN_PATH_LENGTH,
+                 vision_radius=VISION_RADIUS, shadowcast=VISION_SHADOWCAST, move_cooldown=MOVE_COOLDOWN,
+                 pickup_refresh_interval=BALL_PICKUP_REFRESH_INTERVAL,
+                 challenge_time=SHIFT_CHALLENGE_TIME, challenge_presses=SHIFT_CHALLENGE_PRESSES):
+        self.width = width
+        self.height = height
+        self.min_path_length = min_path_length
+        self.vision_radius = vision_radius
+        self.shadowcast = shadowcast
+        self.move_cooldown = move_cooldown
+        self.pickup_refresh_interval = pickup_refresh_interval
+        self.challenge_time = challenge_time
+        self.challenge_presses = challenge_presses
+
+
+class PlayerState:
+    """玩家的逻辑状态：位置、已收集的小球和穿墙模式"""
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+        self.collected = []
+        self.ghost_mode = False  # 添加穿墙模式标志
+
+    def move(self, dx, dy, maze):
+        """按格子移动玩家，只能水平或垂直移动"""
+        # 确保只能水平或垂直移动，不能斜着走
+        if dx != 0 and dy != 0:
+            return False
+
+        # 计算新位置
+        nx, ny = self.x + dx, self.y + dy
+
+        # 检查是否有效
+        if maze.in_bounds(nx, ny):
+            # 如果是穿墙模式，或者是正常模式但目标是路径
+            if self.ghost_mode or maze.get(nx, ny) == PATH:
+                self.x = nx
+                self.y = ny
+                return True
+        return False
+
+    def get_pos(self):
+        """获取玩家的网格位置"""
+        return self.x, self.y
+
+
+def new_seed():
+    """随机取一个新的局种子（不受全局 random 状态影响）"""
+    return random.SystemRandom().getrandbits(63)
+
+
+class GameState:
+    """不依赖 pygame 的游戏核心：全部规则都在 step(inputs, dt) 里推进
+
+    时间由调用方通过 dt（毫秒）驱动；随机数来自本局独立的 rng（由 seed 生成，未指定时随机取一个并记在
+    self.seed 中），相同的 seed、规则和输入序列总能重现同一局。输出信息交给 log（传 None 则静默）。
+    每步发生的、前端需要响应的事情记录在 events 中：
+    ("revealed", cells)、("reset", level)、("scrolled", rows)、("ball", num)、
+    ("completed", level)、("challenge", cell)、("died", None)。
+    """
+
+    def __init__(self, maze_source=None, rng=None, player_factory=PlayerState, log=print, rules=None, seed=None,
+                 prefetch=SYNC, loading=None):
+        self.rules = rules if rules is not None else Rules()
+        if rng is None:
+            if seed is None:
+                seed = new_seed()
+            rng = random.Random(seed)
+        self.seed = seed
+        self.rng = rng
+        self.log = log or _silent
+        self.player_factory = player_factory
+        # 迷宫数据源：返回迷宫网格的无参可调用对象，或 MazeStore 迷宫库，None 表示每关整张生成
+        self.maze_source = maze_source
+        # 每关用独立的种子建图；prefetch 决定如何预建下一关（见 LevelPipeline），
+        # 换关时还没建好就边建边调用 loading(build)
+        self.levels = LevelPipeline(maze_source, self.rules, random.Random(self.rng.getrandbits(64)),
+                                    prefetch, loading)
+        self.level = 1  # 初始为第1关
+        self.show_hint = False
+        self.time = 0
+        self.running = True
+        self.events = []
+
+        # 记录玩家是否已经达成首次收集4个球并到达终点的成就
+        self.first_completed = False
+        self.last_move_time = -self.rules.move_cooldown
+        # 用于玩家拾取小球后的刷新计时
+        self.ball_pickup_refresh_timer = 0
+
+        # Shift键挑战相关变量
+        self.shift_counter = 0
+        self.shift_timer = 0
+        self.shift_challenge_active = False
+        self.shift_challenge_result = None
+
+        self.reset_game()
+        # 确保游戏开始时有4个小球
+        while len(self.balls) < 4:
+            self.refresh_ball()
+
+    def reset_game(self, source=None):
+        if source is not None:
+            self.maze_source = source
+            self.levels.set_source(source)
+        # 迷宫、索引、起终点和小球由关卡流水线建好（通常已经预建完成），这里只是换上
+        level = self.levels.next(self.level)
+        self.maze = level.maze
+        self.tree = level.tree
+        self.topology = level.topology
+        self.start, self.end, self.path = level.start, level.end, level.path
+        # 视野掩码，只在玩家换格时重新计算
+        self.vision = self.make_vision()
+        self.player = self.player_factory(*self.start)
+        # 小球按格子存放，拾取和区域查询都不必遍历全部小球
+        self.balls = BallStore(self.maze.width, self.maze.height, level.balls)
+        # 空闲格采样器：不含终点、玩家和球所在的格子，随放球、拾球和移动同步更新
+        self.free_cells = level.free_cells
+        self.fog_on = True
+        self.minimap_memory = set()
+        self.event_triggered = set()
+        self.hint_key = None
+        self.hint_path = []
+        self.events.append(("reset", self.level))
+        # 新关卡的起点视野立即记入小地图，不必等玩家移动
+        self.reveal()
+
+    def close(self):
+        """停止预建关卡的后台线程"""
+        self.levels.shutdown()
+
+    def make_vision(self):
+        return VisibilityMask(self.maze, self.rules.vision_radius, self.rules.shadowcast)
+
+    def reveal(self):
+        """按玩家当前位置更新视野；视野变化时记入小地图记忆并产生 revealed 事件
+
+        视野只在这里更新，前端绘制时只读，否则前端先更新了视野，这里就不会记入小地图。
+        """
+        if self.vision.update(*self.player.get_pos()):
+            self.minimap_memory.update(self.vision.cells())
+            self.events.append(("revealed", self.vision.cells()))
+
+    def build_free_cells(self):
+        """按当前迷宫和占用情况重建空闲格采样器"""
+        free_cells = FreeCellSampler(get_path_cells(self.maze))
+        free_cells.reserve(self.end)
+        free_cells.reserve(self.player.get_pos())
+        for pos in self.balls.cells():
+            free_cells.reserve(pos)
+        return free_cells
+
+    def vacate(self, cell):
+        """格子上的玩家或小球离开后，若已无其他占用者则放回空闲集合"""
+        if cell == self.end or cell == self.player.get_pos():
+            return
+        if cell in self.balls:
+            return
+        if self.maze.is_path(*cell):
+            self.free_cells.release(cell)
+
+    def refresh_ball(self):
+        """刷新一个新球"""
+        new_ball_pos = self.free_cells.take(self.rng)
+        if new_ball_pos is not None:
+            new_ball_num = self.rng.choice([1, 2, 3, 4])
+            self.balls.add(new_ball_pos[0], new_ball_pos[1], new_ball_num)
+            self.log(f"刷新新球: 位置({new_ball_pos[0]}, {new_ball_pos[1]}), 数字{new_ball_num}")
+
+    def refresh_all_balls(self):
+        """在所有可行路径上刷新满小球"""
+        # 清空现有的球
+        for pos in self.balls.cells():
+            self.free_cells.release(pos)
+        self.balls.clear()
+
+        # 占用所有空闲格（已排除终点和玩家当前位置），起点留空
+        path_cells = self.free_cells.take_all()
+        if self.start in path_cells:
+            path_cells.remove(self.start)
+            self.free_cells.release(self.start)
+
+        # 在所有可行路径上放置小球，而不仅仅是4个
+        self.balls.fill(path_cells, [self.rng.choice([1, 2, 3, 4]) for _ in path_cells])
+        self.log(f"刷新新球: 在{len(path_cells)}个路径格子上放置了小球")
+
+    def follow_stream(self):
+        """无尽模式：玩家接近窗口底部时向下滚动迷宫，并平移所有坐标"""
+        shift = self.player.y - (self.maze.height - ENDLESS_SCROLL_MARGIN)
+        if shift <= 0:
+            return
+        shift = self.maze.scroll(shift)
+        if not shift:
+            return
+        self.player.y -= shift
+        self.start = (self.start[0], self.start[1] - shift)
+        self.balls = BallStore(self.maze.width, self.maze.height,
+                               [((bx, by - shift), num) for (bx, by), num in self.balls if by >= shift])
+        self.minimap_memory = {(x, y - shift) for x, y in self.minimap_memory if y >= shift}
+        self.event_triggered = {(x, y - shift) for x, y in self.event_triggered if y >= shift}
+        self.tree = build_tree_index(self.maze)
+        self.topology = TopologyIndex(self.maze)
+        self.vision = self.make_vision()
+        ex, ey = self.end
+        if ey >= shift:
+            self.end = (ex, ey - shift)
+        else:
+            # 终点滚出了窗口，在窗口下半部分重新放置
+            lower = [(x, y) for x, y in get_path_cells(self.maze) if y >= self.maze.height // 2]
+            self.end = self.rng.choice(lower)
+        self.path = self.find_route(self.player.get_pos(), self.end)
+        self.free_cells = self.build_free_cells()
+        self.events.append(("scrolled", shift))
+
+    def find_route(self, start, end):
+        """两格之间的路线：有树索引时直接查树，否则搜索；不可达返回 None"""
+        if self.tree is not None:
+            return self.tree.path(start, end)
+        return find_path(self.maze, start, end)
+
+    def update_hint(self):
+        """更新从玩家到终点的提示路线，只在玩家或终点位置变化时重新寻路"""
+        key = (self.player.get_pos(), self.end)
+        if self.show_hint and key != self.hint_key:
+            self.hint_key = key
+            self.hint_path = self.find_route(*key) or []
+
+    def collect_all_balls(self):
+        """收集地图上所有的金色小球"""
+        cells, numbers = self.balls.cells(), self.balls.numbers()
+        self.balls.clear()  # 清空地图上的小球
+        self.player.collected.extend(numbers)
+        self.log(f"收集到小球: 共{len(numbers)}个")
+        for cell in cells:
+            self.vacate(cell)
+        self.log("一键收集了地图上所有的金色小球!")
+
+    def step(self, inputs, dt):
+        """推进 dt 毫秒：处理输入、拾球、终点、死角挑战等全部规则，返回本步的事件列表"""
+        self.events = events = []
+        self.time += dt
+        current_time = self.time
+
+        # 无尽模式下随玩家滚动迷宫窗口
+        if isinstance(self.maze, StreamingMaze):
+            self.follow_stream()
+
+        # 获取当前位置和可见区域
+        px, py = self.player.get_pos()
+        with profiler.scope("vision"):
+            self.reveal()
+
+        # 始终确保地图上有4个小球
+        if len(self.balls) < 4:
+            self.refresh_ball()
+            self.log(f"当前球数量: {len(self.balls)}/4，已自动刷新")
+
+        # 持续移动逻辑：按住方向时按冷却时间移动
+        if inputs.move is not None and current_time - self.last_move_time >= self.rules.move_cooldown:
+            # 只有在非挑战状态下或挑战结果为成功时才允许移动
+            if not self.shift_challenge_active and self.shift_challenge_result != "失败":
+                if self.player.move(*inputs.move, self.maze):
+                    self.last_move_time = current_time
+                    self.free_cells.reserve(self.player.get_pos())
+                    self.vacate((px, py))
+
+        # 检查小球收集
+        with profiler.scope("balls"):
+            num = self.balls.take(px, py)
+        if num is not None:
+            self.player.collected.append(num)
+            self.vacate((px, py))
+            self.log(f"收集到小球: {num}")
+            events.append(("ball", num))
+
+            # 设置小球拾取刷新计时器
+            self.ball_pickup_refresh_timer = current_time
+
+        # 到达终点
+        if (px, py) == self.end:
+            self.reach_end()
+
+        # 处理小球拾取后的刷新
+        if current_time - self.ball_pickup_refresh_timer >= self.rules.pickup_refresh_interval and self.first_completed:
+            self.ball_pickup_refresh_timer = current_time
+            # 只有当球的数量少于4个时才刷新
+            if len(self.balls) < 4:
+                self.refresh_ball()
+                self.log("小球拾取3秒后，刷新了一个新球")
+
+        # 死角事件处理 - 添加Shift键挑战
+        with profiler.scope("dead_end"):
+            dead_end = self.topology.is_dead_end(px, py) and (px, py) not in self.event_triggered
+        if dead_end:
+            self.event_triggered.add((px, py))
+            # 启动shift按键挑战
+            self.log(f"死角事件触发: 位置({px},{py})! 请在3秒内连续按击5次shift键!")
+            self.shift_challenge_active = True
+            self.shift_counter = 0
+            self.shift_timer = current_time  # 记录开始时间
+            self.shift_challenge_result = None  # 重置挑战结果
+            events.append(("challenge", (px, py)))
+
+        # 处理shift按键挑战
+        if self.shift_challenge_active and current_time - self.shift_timer > self.rules.challenge_time:
+            self.shift_challenge_active = False
+            if self.shift_counter >= self.rules.challenge_presses:
+                self.log("挑战成功!")
+                self.shift_challenge_result = "成功"
+            else:
+                self.log(f"挑战失败! 你只按了{self.shift_counter}次shift键，未达到5次。")
+                self.shift_challenge_result = "失败"
+                self.log("*你死了*")
+                self.running = False  # 挑战失败，游戏结束
+                events.append(("died", None))
+
+        for action in inputs.actions:
+            self.apply(action)
+
+        with profiler.scope("hint"):
+            self.update_hint()
+        return events
+
+    def reach_end(self):
+        """玩家站在终点上"""
+        if len(self.player.collected) < 4:
+            self.log("你到达了终点，但没有收集齐所有小球")
+            return
+        self.log("你成功收集了所有小球并到达了终点!")
+
+        # 如果是首次完成，则清空玩家身上的球并刷新所有路径上的球
+        if not self.first_completed:
+            self.first_completed = True
+            self.player.collected = []  # 清空玩家身上的球
+            self.refresh_all_balls()    # 刷新所有路径上的球
+            self.log("首次完成任务！已在所有路径上刷新满小球")
+        else:
+            # 第二次完成任务时，关卡递增并刷新迷宫
+            self.level += 1  # 关卡递增
+            self.log(f"恭喜通过第{self.level-1}关！进入第{self.level}关")
+            self.events.append(("completed", self.level - 1))
+            self.reset_game()  # 重置游戏，生成新迷宫
+            self.player.collected = []  # 清空玩家身上的球
+            self.first_completed = False  # 重置首次完成标志
+
+    def apply(self, action):
+        """处理一个离散操作"""
+        if action == QUIT:
+            self.running = False
+        elif action == SHIFT:
+            # 处理shift按键挑战
+            if self.shift_challenge_active:
+                self.shift_counter += 1
+                self.log(f"按键次数: {self.shift_counter}/10")
+        elif action == LEVEL_UP:
+            self.level += 1
+        elif action == LEVEL_DOWN:
+            self.level -= 1
+        elif action == TOGGLE_FOG:
+            # 雾模式切换
+            self.fog_on = not self.fog_on
+        elif action == TOGGLE_GHOST:
+            # 穿墙模式切换
+            self.player.ghost_mode = not self.player.ghost_mode
+            if self.player.ghost_mode:
+                self.log("穿墙模式已开启")
+            else:
+                self.log("穿墙模式已关闭")
+        elif action == COLLECT_ALL:
+            # 一键收集所有小球
+            self.collect_all_balls()
+        elif action == TOGGLE_HINT:
+            # 提示路线切换
+            self.show_hint = not self.show_hint
+            self.hint_key = None
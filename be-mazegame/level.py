@@ -0,0 +1,84 @@
+import random
+
+from maze_grid import PATH
+from maze_gen import SLICE
+from pathfinding import find_path
+from maze_tree import build_tree_index
+from maze_topology import TopologyIndex
+from cell_sampler import FreeCellSampler
+
+
+def get_path_cells(maze):
+    return maze.cells_of(PATH)
+
+def free_cells_steps(maze):
+    """分段建含全部路格的空闲格采样器：每约 SLICE 格产出一次进度（0~1），结束时返回采样器"""
+    free_cells = FreeCellSampler()
+    w, cells = maze.width, maze.cells
+    total = max(1, cells.count(PATH))
+    needle = bytes([PATH])
+    batch = []
+    i = cells.find(needle)
+    while i != -1:
+        batch.append((i % w, i // w))
+        if len(batch) == SLICE:
+            free_cells.extend(batch)
+            batch = []
+            yield len(free_cells) / total
+        i = cells.find(needle, i + 1)
+    free_cells.extend(batch)
+    return free_cells
+
+def find_unique_path(maze, start, end):
+    return find_path(maze, start, end)
+
+def random_start_end(maze, min_length=0, tree=None, rng=random):
+    # 完美迷宫用树索引选点：距离查询 O(log n)，不必反复 BFS
+    if tree is None:
+        tree = build_tree_index(maze)
+    if tree is not None:
+        start, end = tree.random_pair(rng, min_length)
+        return start, end, tree.path(start, end)
+
+    path_cells = get_path_cells(maze)
+    while True:
+        start = rng.choice(path_cells)
+        end = rng.choice(path_cells)
+        if start != end:
+            path = find_unique_path(maze, start, end)
+            if path:
+                return start, end, path
+
+def find_dead_ends(maze):
+    return TopologyIndex(maze).dead_ends()
+
+def place_balls(maze, tree=None, free_cells=None, rng=random):
+    # 从空闲格采样器中取格子放球；未提供采样器时，使用除一对随机起终点外的所有路径格子
+    if free_cells is None:
+        free_cells = FreeCellSampler(get_path_cells(maze))
+        try:
+            start, end, _ = random_start_end(maze, tree=tree, rng=rng)
+            free_cells.reserve(start)
+            free_cells.reserve(end)
+        except ValueError:
+            pass
+
+    # 确保有足够的路径格子放置球
+    if len(free_cells) < 4:
+        raise ValueError("路径格子数量不足以放置4个球")
+
+    balls = [free_cells.take(rng) for _ in range(4)]
+    numbers = rng.sample([1, 2, 3, 4], 4)
+    return [(balls[i], numbers[i]) for i in range(4)]
+
+def clamp(val, minv, maxv):
+    return max(minv, min(val, maxv))
+
+def get_visible(maze, px, py, radius):
+    visible = set()
+    for dy in range(-radius, radius+1):
+        for dx in range(-radius, radius+1):
+            nx, ny = px+dx, py+dy
+            if maze.in_bounds(nx, ny):
+                visible.add((nx, ny))
+    return visible
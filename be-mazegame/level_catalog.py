@@ -0,0 +1,315 @@
+"""关卡目录：为迷宫库中的每一关算难度指标，按难度排序建索引，换关时按关卡号取相应难度的迷宫
+
+指标（path 为路格数）：
+    solution       起点到终点的解路步数
+    dead_ends      死胡同数（与 TopologyIndex 一致，不算边框上的格子）
+    branching      分岔率：度数不小于 3 的路格占比
+    river          河流系数：度数为 2 的路格（走廊）占比，越高迷宫越“顺流”，分支越少越长
+    ball_distance  小球到终点的平均步数
+    difficulty     0.4*solution/path + 0.3*ball_distance/path + 0.2*branching + 0.1*(1-river)，乘以 100
+
+有 NumPy 时同尺寸的迷宫叠成 (n, h, w) 数组批量计算，没有时逐个迷宫用索引计算。
+目录存为迷宫库旁的 .cat 文件：头部 b"MZCT"、版本号、关卡数和迷宫库内容的 SHA-256 摘要，
+然后各列 float32，最后是按难度排序的下标。迷宫库重新生成后摘要对不上，打开时重新计算目录。
+
+用法：
+    python level_catalog.py build levels.mzs
+    python level_catalog.py query levels.mzs 20 30
+    python level_catalog.py levels levels.mzs
+"""
+import argparse
+import bisect
+import struct
+import sys
+import time
+from array import array
+
+from maze_grid import PATH
+from maze_store import MazeStore
+from maze_tree import build_tree_index
+from maze_topology import TopologyIndex
+from pathfinding import find_path
+from settings import CATALOG_LEVEL_STEP, CATALOG_BAND
+
+try:
+    import numpy as np
+except ImportError:  # 没有 NumPy 时逐个迷宫计算
+    np = None
+
+MAGIC = b"MZCT"
+VERSION = 2
+HEADER = struct.Struct("<4sII32s")
+COLUMNS = ("solution", "dead_ends", "branching", "river", "ball_distance", "difficulty")
+# 每批叠在一起计算的迷宫数，限制临时数组的内存
+BATCH = 256
+
+
+def difficulty(path_cells, solution, branching, river, ball_distance):
+    path_cells = max(path_cells, 1)
+    return 100 * (0.4 * solution / path_cells + 0.3 * ball_distance / path_cells
+                  + 0.2 * branching + 0.1 * (1 - river))
+
+
+def _measure_numpy(mazes, starts, ends, balls):
+    """同尺寸迷宫批量计算，返回每列一个列表"""
+    n = len(mazes)
+    h, w = mazes[0].height, mazes[0].width
+    grids = np.frombuffer(b"".join(bytes(m.cells) for m in mazes), dtype=np.uint8).reshape(n, h, w)
+    open_ = grids == PATH
+
+    # 四邻中路格的个数
+    degree = np.zeros((n, h, w), dtype=np.int8)
+    degree[:, :, 1:] += open_[:, :, :-1]
+    degree[:, :, :-1] += open_[:, :, 1:]
+    degree[:, 1:, :] += open_[:, :-1, :]
+    degree[:, :-1, :] += open_[:, 1:, :]
+    degree[~open_] = 0
+    path_cells = open_.sum(axis=(1, 2))
+    dead_ends = (degree[:, 1:-1, 1:-1] == 1).sum(axis=(1, 2))
+    junctions = (degree >= 3).sum(axis=(1, 2))
+    corridors = (degree == 2).sum(axis=(1, 2))
+
+    # 从各自终点同时做 BFS，只记录起点和小球（目标格）到终点的步数，目标都到达后即停止
+    tk, tx, ty = [], [], []
+    for k in range(n):
+        for x, y in (starts[k], *balls[k]):
+            tk.append(k)
+            tx.append(x)
+            ty.append(y)
+    frontier = np.zeros((n, h, w), dtype=bool)
+    frontier[np.arange(n), [e[1] for e in ends], [e[0] for e in ends]] = True
+    visited = frontier.copy()
+    target_dist = np.where(frontier[tk, ty, tx], 0, -1)
+    grow = np.empty_like(frontier)
+    step = 0
+    while (target_dist < 0).any() and frontier.any():
+        step += 1
+        grow[...] = False
+        grow[:, :, 1:] |= frontier[:, :, :-1]
+        grow[:, :, :-1] |= frontier[:, :, 1:]
+        grow[:, 1:, :] |= frontier[:, :-1, :]
+        grow[:, :-1, :] |= frontier[:, 1:, :]
+        grow &= open_
+        # grow > visited 即 grow 且未访问
+        np.greater(grow, visited, out=grow)
+        visited |= grow
+        target_dist[(target_dist < 0) & grow[tk, ty, tx]] = step
+        frontier, grow = grow, frontier
+
+    # 目标按 (起点, 小球...) 的顺序逐个迷宫排列
+    solution = []
+    ball_distance = []
+    pos = 0
+    for k in range(n):
+        solution.append(int(target_dist[pos]))
+        ds = target_dist[pos + 1:pos + 1 + len(balls[k])]
+        ball_distance.append(float(ds.mean()) if len(ds) else 0.0)
+        pos += 1 + len(balls[k])
+
+    branching = junctions / np.maximum(path_cells, 1)
+    river = corridors / np.maximum(path_cells, 1)
+    return {
+        "solution": solution,
+        "dead_ends": dead_ends.tolist(),
+        "branching": branching.tolist(),
+        "river": river.tolist(),
+        "ball_distance": ball_distance,
+        "path_cells": path_cells.tolist(),
+    }
+
+
+def _measure_python(mazes, starts, ends, balls):
+    result = {name: [] for name in ("solution", "dead_ends", "branching", "river", "ball_distance", "path_cells")}
+    for maze, start, end, cells in zip(mazes, starts, ends, balls):
+        tree = build_tree_index(maze)
+        topology = TopologyIndex(maze)
+        path_cells = max(maze.count(PATH), 1)
+        degrees = [topology.degree[i] for i in maze.indices_of(PATH)]
+
+        def distance(a):
+            if tree is not None:
+                return tree.distance(a, end)
+            path = find_path(maze, a, end)
+            return len(path) - 1 if path else -1
+
+        ds = [distance(cell) for cell in cells]
+        result["solution"].append(distance(start))
+        result["dead_ends"].append(topology.count_dead_ends())
+        result["branching"].append(sum(1 for d in degrees if d >= 3) / path_cells)
+        result["river"].append(degrees.count(2) / path_cells)
+        result["ball_distance"].append(sum(ds) / len(ds) if ds else 0.0)
+        result["path_cells"].append(path_cells)
+    return result
+
+
+def measure(mazes, starts, ends, balls):
+    """批量计算指标；balls 为每个迷宫的小球格子列表。返回 COLUMNS 中每列一个列表"""
+    if not mazes:
+        return {name: [] for name in COLUMNS}
+    size = (mazes[0].width, mazes[0].height)
+    same_size = all((m.width, m.height) == size for m in mazes)
+    if np is not None and same_size:
+        result = _measure_numpy(mazes, starts, ends, balls)
+    else:
+        result = _measure_python(mazes, starts, ends, balls)
+    result["difficulty"] = [
+        difficulty(p, s, b, r, d) for p, s, b, r, d in
+        zip(result["path_cells"], result["solution"], result["branching"], result["river"], result["ball_distance"])
+    ]
+    del result["path_cells"]
+    return result
+
+
+class LevelCatalog:
+    """迷宫库加上按难度排序的索引
+
+    between(lo, hi) 用二分查找返回难度在 [lo, hi] 内的关卡下标；
+    pick(rng, level) 按关卡号取难度分位带：第 1 关在最简单的 CATALOG_BAND 内，
+    之后每关上移 CATALOG_LEVEL_STEP，到最难的一带为止。
+    """
+
+    def __init__(self, store, columns, order=None):
+        self.store = store
+        self.columns = columns
+        keys = columns["difficulty"]
+        if order is None:
+            order = array("i", sorted(range(len(keys)), key=keys.__getitem__))
+        self.order = order
+        self.keys = array("f", [keys[i] for i in order])
+
+    @classmethod
+    def build(cls, store, log=print):
+        """为迷宫库中的所有关卡计算指标；同尺寸的关卡按 BATCH 个一批"""
+        columns = {name: array("f", bytes(4 * len(store))) for name in COLUMNS}
+        groups = {}
+        for i in range(len(store)):
+            groups.setdefault(store.info(i)[:2], []).append(i)
+        done = 0
+        for indices in groups.values():
+            for k in range(0, len(indices), BATCH):
+                batch = indices[k:k + BATCH]
+                levels = [store.read(i) for i in batch]
+                result = measure([lv[0] for lv in levels], [lv[1] for lv in levels], [lv[2] for lv in levels],
+                                 [[cell for cell, _ in lv[3]] for lv in levels])
+                for name in COLUMNS:
+                    column = columns[name]
+                    for i, value in zip(batch, result[name]):
+                        column[i] = value
+                done += len(batch)
+                if log:
+                    log(f"已计算 {done}/{len(store)}")
+        return cls(store, columns)
+
+    @classmethod
+    def open(cls, path, log=print):
+        """打开迷宫库及其目录文件；目录不存在或与迷宫库不符时重新计算并保存
+
+        保存失败（如迷宫库在只读目录中）时只提示一下，照常使用内存中的目录。
+        """
+        store = MazeStore(path)
+        try:
+            return cls.load(store, path + ".cat")
+        except (OSError, ValueError, EOFError, struct.error):
+            catalog = cls.build(store, log)
+            try:
+                catalog.save(path + ".cat")
+            except OSError as e:
+                if log:
+                    log(f"无法保存关卡目录 {path}.cat：{e}")
+            return catalog
+
+    @classmethod
+    def load(cls, store, path):
+        with open(path, "rb") as f:
+            magic, version, count, digest = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} 不是关卡目录文件")
+            if count != len(store) or digest != store.digest():
+                raise ValueError(f"{path} 与迷宫库的内容不符")
+            columns = {}
+            for name in COLUMNS:
+                columns[name] = array("f")
+                columns[name].fromfile(f, count)
+            order = array("i")
+            order.fromfile(f, count)
+        return cls(store, columns, order)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(self), self.store.digest()))
+            for name in COLUMNS:
+                self.columns[name].tofile(f)
+            self.order.tofile(f)
+
+    def __len__(self):
+        return len(self.order)
+
+    def metrics(self, i):
+        return {name: self.columns[name][i] for name in COLUMNS}
+
+    def between(self, lo, hi):
+        """难度在 [lo, hi] 内的关卡下标（按难度升序）"""
+        a = bisect.bisect_left(self.keys, lo)
+        b = bisect.bisect_right(self.keys, hi)
+        return self.order[a:b]
+
+    def band(self, level):
+        """第 level 关对应的难度范围 (lo, hi)"""
+        n = len(self.keys)
+        q0 = min(max(0.0, (level - 1) * CATALOG_LEVEL_STEP), 1 - CATALOG_BAND)
+        lo = self.keys[int(q0 * (n - 1))]
+        hi = self.keys[int((q0 + CATALOG_BAND) * (n - 1))]
+        return lo, hi
+
+    def pick(self, rng, level=1):
+        """按关卡号随机取一个难度相当的关卡，返回值同 MazeStore.read"""
+        candidates = self.between(*self.band(level))
+        return self.store.read(candidates[rng.randrange(len(candidates))])
+
+    def close(self):
+        self.store.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="迷宫库的难度目录")
+    commands = parser.add_subparsers(dest="command", required=True)
+    p = commands.add_parser("build", help="计算难度指标并写入目录文件")
+    p.add_argument("path")
+    p = commands.add_parser("query", help="查询难度在 [lo, hi] 内的关卡")
+    p.add_argument("path")
+    p.add_argument("lo", type=float)
+    p.add_argument("hi", type=float)
+    p = commands.add_parser("levels", help="列出前若干关对应的难度范围")
+    p.add_argument("path")
+    p.add_argument("-n", type=int, default=12)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        store = MazeStore(args.path)
+        started = time.perf_counter()
+        catalog = LevelCatalog.build(store, log=lambda message: sys.stderr.write(f"\r{message}"))
+        sys.stderr.write("\n")
+        catalog.save(args.path + ".cat")
+        elapsed = time.perf_counter() - started
+        print(f"{len(catalog)} 关，用时 {elapsed:.2f}s（{len(catalog) / max(elapsed, 1e-9):.0f} 关/秒，"
+              f"{'NumPy' if np is not None else '纯 Python'}）")
+        return
+    catalog = LevelCatalog.open(args.path)
+    if args.command == "query":
+        started = time.perf_counter()
+        found = catalog.between(args.lo, args.hi)
+        elapsed = time.perf_counter() - started
+        print(f"难度 [{args.lo}, {args.hi}]：{len(found)} 关，查询用时 {elapsed * 1e6:.1f} 微秒")
+        print(f"{'下标':>8}" + "".join(f"{name:>14}" for name in COLUMNS))
+        for i in list(found)[:10]:
+            metrics = catalog.metrics(i)
+            print(f"{i:>8}" + "".join(f"{metrics[name]:>14.3f}" for name in COLUMNS))
+    else:
+        for level in range(1, args.n + 1):
+            lo, hi = catalog.band(level)
+            print(f"第 {level:>2} 关：难度 {lo:6.2f} ~ {hi:6.2f}，{len(catalog.between(lo, hi))} 关可选")
+    catalog.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import random
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from maze_gen import generate_maze_steps
+from maze_tree import build_tree_index_steps
+from maze_topology import TopologyIndex
+from level import free_cells_steps, random_start_end, place_balls
+from maze_store import MazeStore
+from level_catalog import LevelCatalog
+from scheduler import run_sliced
+from settings import LOADING_FRAME_BUDGET
+
+# 预建下一关的方式
+SYNC = "sync"      # 不预建，换关时当场建
+THREAD = "thread"  # 在后台线程里建
+SLICE = "slice"    # 在主线程里分帧建，每帧由调用方给定时间预算
+
+
+class Level:
+    """一关的全部初始数据：迷宫、索引、起终点和小球，由 LevelBuild 一次建好"""
+
+    __slots__ = ("seed", "maze", "tree", "topology", "start", "end", "path", "balls", "free_cells")
+
+
+class LevelBuild:
+    """按 seed 分步建一关
+
+    steps 是可恢复的迭代器，每做一小段工作产出一次；耗尽后 level 为建好的关卡。
+    建图过程中 maze 是挖到一半的迷宫、progress 是进度（0~1），可用于加载动画。
+    只用自己的 rng，可以在后台线程里运行。
+    """
+
+    def __init__(self, maze_source, rules, seed, level=1):
+        self.maze_source = maze_source
+        self.rules = rules
+        self.seed = seed
+        self.level_number = level
+        self.maze = None
+        self.level = None
+        self.progress = 0.0
+        self.steps = self._build()
+
+    def _build(self):
+        rng = random.Random(self.seed)
+        level = Level()
+        level.seed = self.seed
+        stored = None
+        if isinstance(self.maze_source, (MazeStore, LevelCatalog)):
+            # 从迷宫库取现成的一关，起终点和小球也一并取出；关卡目录会按关卡号选难度
+            self.maze, start, end, balls = self.maze_source.pick(rng, self.level_number)
+            stored = (start, end, balls)
+        elif self.maze_source is None:
+            self.maze, carving = generate_maze_steps(self.rules.width, self.rules.height, rng=rng)
+            # 挖迷宫约占建关时间的一半，其余是下面几个索引
+            for progress in carving:
+                self.progress = progress * 0.5
+                yield
+        else:
+            self.maze = self.maze_source()
+        level.maze = self.maze
+        self.progress = 0.5
+        yield
+        # 完美迷宫的树索引，每个迷宫只建一次；有环路的迷宫为 None
+        level.tree = yield from self._stage(build_tree_index_steps(level.maze), 0.5, 0.75)
+        # 度数与死胡同索引，每帧的死胡同判断只需查表
+        level.topology = yield from self._stage(TopologyIndex.build_steps(level.maze), 0.75, 0.85)
+        # 空闲格采样器：不含终点、玩家和球所在的格子
+        level.free_cells = yield from self._stage(free_cells_steps(level.maze), 0.85, 0.95)
+        if stored is None:
+            if level.tree is not None:
+                # 与 random_start_end 相同的选点方式，只是长路径也分段取出
+                level.start, level.end = level.tree.random_pair(rng, self.rules.min_path_length)
+                level.path = yield from self._stage(level.tree.path_steps(level.start, level.end), 0.95, 1.0)
+            else:
+                level.start, level.end, level.path = random_start_end(level.maze, self.rules.min_path_length,
+                                                                      None, rng)
+            level.free_cells.reserve(level.end)
+            level.free_cells.reserve(level.start)
+            level.balls = place_balls(level.maze, level.tree, level.free_cells, rng)
+        else:
+            level.start, level.end, level.balls = stored
+            level.path = yield from self._stage(level.tree.path_steps(level.start, level.end), 0.95, 1.0)
+            for cell in (level.start, level.end, *(pos for pos, _ in level.balls)):
+                level.free_cells.reserve(cell)
+        self.progress = 1.0
+        self.level = level
+
+    def _stage(self, steps, low, high):
+        """推进一个分段建的索引，把它的进度映射到 low~high，返回建好的结果"""
+        while True:
+            try:
+                progress = next(steps)
+            except StopIteration as done:
+                return done.value
+            self.progress = low + (high - low) * progress
+            yield
+
+    def finish(self):
+        """一次建完剩下的部分，返回 Level"""
+        for _ in self.steps:
+            pass
+        return self.level
+
+
+def build_level(maze_source, rules, seed, level=1):
+    """按 seed 一次建好一关"""
+    return LevelBuild(maze_source, rules, seed, level).finish()
+
+
+class LevelPipeline:
+    """关卡流水线：玩当前关时预先建好下一关，换关时直接取用
+
+    每关的种子依次取自 seeds，与预建何时完成无关，因此同一种子下的关卡序列总是相同的。
+    mode 为 THREAD 时在后台线程里建（无尽模式的数据源是闭包，不能交给进程池）；
+    为 SLICE 时不开线程，由调用方每帧调用 work(budget) 分段推进；SYNC 则换关时当场建。
+    换关时下一关还没建好，就分段建完，每段之间调用一次 loading(build)，供前端显示加载动画。
+    """
+
+    def __init__(self, maze_source, rules, seeds, mode=SYNC, loading=None):
+        self.maze_source = maze_source
+        self.rules = rules
+        self.seeds = seeds
+        self.mode = mode
+        self.loading = loading
+        self.pool = ThreadPoolExecutor(max_workers=1) if mode == THREAD else None
+        self.next_seed = None
+        self.next_level = None
+        self.building = None
+        self.pending = None
+
+    def _prefetch(self, seed=None, level=1):
+        if seed is None:
+            seed = self.seeds.getrandbits(64)
+        self.next_seed = seed
+        self.next_level = level
+        self.building = None
+        self.pending = None
+        if self.mode == SYNC:
+            return
+        self.building = LevelBuild(self.maze_source, self.rules, seed, level)
+        if self.pool is not None:
+            self.pending = self.pool.submit(self.building.finish)
+
+    def next(self, level=1):
+        """取出第 level 关（还没建好时等它建完），并按 level+1 开始预建再下一关"""
+        if self.next_seed is None:
+            self._prefetch(level=level)
+        elif level != self.next_level and isinstance(self.maze_source, LevelCatalog):
+            # 预建时猜的关卡号不对（例如按了 L/R 键），难度不同，用同一种子重建
+            self._cancel()
+            self._prefetch(self.next_seed, level)
+        build = self.building or LevelBuild(self.maze_source, self.rules, self.next_seed, level)
+        if self.pending is not None:
+            while self.loading is not None and not self.pending.done():
+                self.loading(build)
+                wait([self.pending], LOADING_FRAME_BUDGET / 1000)
+            built = self.pending.result()
+        elif self.loading is None:
+            built = build.finish()
+        else:
+            while not run_sliced(build.steps, LOADING_FRAME_BUDGET)[0]:
+                self.loading(build)
+            built = build.level
+        self._prefetch(level=level + 1)
+        return built
+
+    def work(self, budget):
+        """SLICE 模式下把预建推进 budget 毫秒，其余模式什么也不做"""
+        if self.mode == SLICE and self.building is not None and self.building.level is None:
+            run_sliced(self.building.steps, budget)
+
+    def ready(self):
+        """下一关是否已经建好（换关不会卡顿）"""
+        return self.building is not None and self.building.level is not None
+
+    def set_source(self, maze_source):
+        """换用新的迷宫数据源：丢弃预建的关卡，按同一种子用新数据源重建"""
+        self.maze_source = maze_source
+        self._cancel()
+        if self.next_seed is not None:
+            self._prefetch(self.next_seed, self.next_level)
+
+    def _cancel(self):
+        if self.pending is not None:
+            self.pending.cancel()
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
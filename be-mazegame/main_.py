@@ -1,217 +1,68 @@
 from xmlrpc.client import MAXINT
 
 import pygame
-import random
 import sys
 import math
 import os
-import urllib.request
-from collections import deque
-
-# 迷宫参数
-CELL_SIZE = 30  # 增大格子尺寸
-MAZE_WIDTH = 40  # 增加迷宫宽度
-MAZE_HEIGHT = 27  # 增加迷宫高度
-PATH_WIDTH = 2  # 扩宽迷宫道路
-WALL = 1
-PATH = 0
-
-# 玩家尺寸 - 恢复原来的尺寸
-PLAYER_SIZE = CELL_SIZE - 8  # 恢复为原来的尺寸
-
-# 颜色
-WHITE = (255, 255, 255)
-BLACK = (0, 0, 0)
-GREEN = (0, 255, 0)
-RED = (255, 0, 0)
-GRAY = (180, 180, 180)
-BLUE = (0, 0, 255)
-YELLOW = (255, 255, 0)
-DARK = (30, 30, 30)
-
-# 小地图参数
-MINIMAP_SCALE = 0.25
-MINIMAP_MARGIN = 10
-
-# 材质缓存
-textures = {}
-
-def load_texture_from_url(url, size=None):
-    """从URL或本地文件路径加载材质"""
-    if url in textures:
-        return textures[url]
-
-    try:
-        # 判断是否为本地文件路径
-        if os.path.isfile(url):
-            # 直接加载本地文件
-            texture = pygame.image.load(url)
-        else:
-            # 创建临时文件目录
-            temp_dir = "temp_textures"
-            os.makedirs(temp_dir, exist_ok=True)
-
-            # 生成唯一文件名
-            filename = os.path.join(temp_dir, f"texture_{hash(url) % 10000}.png")
-
-            # 下载图片
-            urllib.request.urlretrieve(url, filename)
-
-            # 加载图片
-            texture = pygame.image.load(filename)
-
-        # 调整大小
-        if size:
-            texture = pygame.transform.scale(texture, size)
-
-        # 缓�����并返回
-        textures[url] = texture
-        return texture
-    except Exception as e:
-        print(f"无法加载材质 {url}: {e}")
-        # 返回默认彩色矩形作为纹理
-        surf = pygame.Surface((CELL_SIZE, CELL_SIZE))
-        surf.fill((random.randint(100, 255), random.randint(100, 255), random.randint(100, 255)))
-        return surf
-
-# 生成迷宫（递归回溯法）
-def generate_maze(width, height):
-    maze = [[WALL for _ in range(width)] for _ in range(height)]
-    stack = []
-    start_x, start_y = random.randrange(1, width, 2), random.randrange(1, height, 2)
-    maze[start_y][start_x] = PATH
-    stack.append((start_x, start_y))
-    dirs = [(-2,0),(2,0),(0,-2),(0,2)]
-    while stack:
-        x, y = stack[-1]
-        random.shuffle(dirs)
-        for dx, dy in dirs:
-            nx, ny = x + dx, y + dy
-            if 0 < nx < width and 0 < ny < height and maze[ny][nx] == WALL:
-                maze[ny][nx] = PATH
-                maze[y + dy//2][x + dx//2] = PATH
-                stack.append((nx, ny))
-                break
-        else:
-            stack.pop()
-    return maze
-
-def get_path_cells(maze):
-    return [(x, y) for y, row in enumerate(maze) for x, v in enumerate(row) if v == PATH]
-
-def find_unique_path(maze, start, end):
-    queue = deque([(start, [start])])
-    visited = set([start])
-    while queue:
-        (x, y), path = queue.popleft()
-        if (x, y) == end:
-            return path
-        for dx, dy in [(-1,0),(1,0),(0,-1),(0,1)]:
-            nx, ny = x + dx, y + dy
-            if 0 <= nx < MAZE_WIDTH and 0 <= ny < MAZE_HEIGHT and maze[ny][nx] == PATH and (nx, ny) not in visited:
-                visited.add((nx, ny))
-                queue.append(((nx, ny), path + [(nx, ny)]))
-    return None
 
-def random_start_end(maze):
-    path_cells = get_path_cells(maze)
-    while True:
-        start = random.choice(path_cells)
-        end = random.choice(path_cells)
-        if start != end:
-            path = find_unique_path(maze, start, end)
-            if path:
-                return start, end, path
-
-def find_dead_ends(maze):
-    dead_ends = []
-    for y in range(1, MAZE_HEIGHT-1):
-        for x in range(1, MAZE_WIDTH-1):
-            if maze[y][x] == PATH:
-                cnt = 0
-                for dx, dy in [(-1,0),(1,0),(0,-1),(0,1)]:
-                    if maze[y+dy][x+dx] == PATH:
-                        cnt += 1
-                if cnt == 1:
-                    dead_ends.append((x, y))
-    return dead_ends
-
-def place_balls(maze):
-    # 获取所有路径格子而不是死胡同
-    path_cells = get_path_cells(maze)
-
-    # 移除起点和终点(如果有的话)
-    try:
-        start_end = random_start_end(maze)
-        if start_end:
-            start, end, _ = start_end
-            if start in path_cells:
-                path_cells.remove(start)
-            if end in path_cells:
-                path_cells.remove(end)
-    except:
-        pass
-
-    # 确保有足够的路径格子放置球
-    if len(path_cells) < 4:
-        raise ValueError("路径格子数量不足以放置4个球")
-
-    balls = random.sample(path_cells, 4)
-    numbers = random.sample([1, 2, 3, 4], 4)
-    return [(balls[i], numbers[i]) for i in range(4)]
-
-def clamp(val, minv, maxv):
-    return max(minv, min(val, maxv))
-
-# 迷雾视野
-VISION_RADIUS = 2
-
-def get_visible(maze, px, py, radius):
-    visible = set()
-    for dy in range(-radius, radius+1):
-        for dx in range(-radius, radius+1):
-            nx, ny = px+dx, py+dy
-            if 0 <= nx < MAZE_WIDTH and 0 <= ny < MAZE_HEIGHT:
-                visible.add((nx, ny))
-    return visible
-
-class Player:
+from maze_stream import endless_source
+from game_state import (
+    GameState, Rules, PlayerState, Inputs, new_seed, UP, DOWN, LEFT, RIGHT,
+    SHIFT, LEVEL_UP, LEVEL_DOWN, TOGGLE_FOG, TOGGLE_GHOST, COLLECT_ALL, TOGGLE_HINT, QUIT,
+)
+from replay import Recorder
+from level_catalog import LevelCatalog
+from scheduler import FixedStep
+from profiler import profiler
+from renderer import MazeRenderer
+from minimap import Minimap
+from text_cache import render_text, get_font, prerender_balls
+from texture_loader import TextureLoader
+from atlas import TextureAtlas
+from sprite_cache import scaled_sprite, filled_sprite
+from settings import (
+    CELL_SIZE, MAZE_WIDTH, MAZE_HEIGHT, VIEW_WIDTH, VIEW_HEIGHT, PLAYER_SIZE, RENDER_FPS,
+    LEVEL_PREFETCH, LEVEL_BUILD_BUDGET,
+    WHITE, BLACK, GREEN, RED, GRAY, BLUE, YELLOW, DARK, MINIMAP_SCALE, MINIMAP_MARGIN,
+    PROFILE_TRACE_PATH, PROFILE_OVERLAY_INTERVAL,
+)
+
+# 材质加载器：远程材质在后台线程下载并缓存到磁盘，本地文件直接加载
+texture_loader = TextureLoader()
+
+def load_texture_from_url(url, size=None, on_ready=None):
+    """从URL或本地文件路径加载材质；远程材质未就绪时返回 None，下载完成后调用 on_ready(surface)"""
+    return texture_loader.load(url, size, on_ready)
+
+# 按键到游戏操作的映射，规则本身在 game_state 中，与 pygame 无关
+MOVE_KEYS = ((pygame.K_w, UP), (pygame.K_s, DOWN), (pygame.K_a, LEFT), (pygame.K_d, RIGHT))
+KEY_ACTIONS = {
+    pygame.K_LSHIFT: SHIFT, pygame.K_RSHIFT: SHIFT,
+    pygame.K_l: LEVEL_UP, pygame.K_r: LEVEL_DOWN,
+    pygame.K_f: TOGGLE_FOG, pygame.K_g: TOGGLE_GHOST,
+    pygame.K_o: COLLECT_ALL, pygame.K_h: TOGGLE_HINT,
+}
+# 只在前端处理、不进入游戏逻辑（也不录像）的按键
+PROFILE_KEY = pygame.K_F3  # 显示/隐藏性能面板
+TRACE_KEY = pygame.K_F4    # 导出 Chrome trace
+
+class Player(PlayerState):
+    """带材质和绘制的玩家，逻辑部分继承自 PlayerState"""
+
     def __init__(self, x, y, texture_url=None):
-        self.x = x
-        self.y = y
-        self.collected = []
+        super().__init__(x, y)
         self.texture_url = texture_url
         self.texture = None
-        self.ghost_mode = False  # 添加穿墙模式标志
         if texture_url:
             self.load_texture(texture_url)
 
     def load_texture(self, url):
         """加载玩家材质"""
         self.texture_url = url
-        self.texture = load_texture_from_url(url, (PLAYER_SIZE, PLAYER_SIZE))
-
-    def move(self, dx, dy, maze):
-        """按格子移动玩家，只能水平或垂直移动"""
-        # 确保只能水平或垂直移动，不能斜着走
-        if dx != 0 and dy != 0:
-            return False
-
-        # 计算新位置
-        nx, ny = self.x + dx, self.y + dy
-
-        # 检查是否有效
-        if 0 <= nx < MAZE_WIDTH and 0 <= ny < MAZE_HEIGHT:
-            # 如果是穿墙模式，或者是正常模式但目标是路径
-            if self.ghost_mode or maze[ny][nx] == PATH:
-                self.x = nx
-                self.y = ny
-                return True
-        return False
-
-    def get_pos(self):
-        """获取玩家的网格位置"""
-        return self.x, self.y
+        self.texture = load_texture_from_url(url, (PLAYER_SIZE, PLAYER_SIZE), self.set_texture)
+
+    def set_texture(self, texture):
+        self.texture = texture
 
     def draw(self, surface, x=None, y=None, size=None):
         """绘制玩家"""
@@ -223,28 +74,28 @@ class Player:
 
         if self.texture:
             if size:
-                # 如果提供了尺寸参数，缩放纹理
-                scaled_texture = pygame.transform.scale(self.texture, size)
-                surface.blit(scaled_texture, (x, y))
+                # 如果提供了尺寸参数，使用缓存的缩放纹理
+                surface.blit(scaled_sprite(self.texture, size), (x, y))
             else:
                 surface.blit(self.texture, (x, y))
         else:
             # 默认绘制方式，穿墙模式下使用半透明颜色
             color = GREEN
             if self.ghost_mode:
-                # 创建半透明的颜色
-                surface_temp = pygame.Surface((size[0] if size else PLAYER_SIZE, size[1] if size else PLAYER_SIZE), pygame.SRCALPHA)
-                pygame.draw.rect(surface_temp, (*GREEN, 128), (0, 0, size[0] if size else PLAYER_SIZE, size[1] if size else PLAYER_SIZE))
-                surface.blit(surface_temp, (x, y))
+                # 半透明的颜色块，按尺寸缓存
+                surface.blit(filled_sprite(size or (PLAYER_SIZE, PLAYER_SIZE), (*GREEN, 128)), (x, y))
             else:
                 pygame.draw.rect(surface, color, (x, y, size[0] if size else PLAYER_SIZE, size[1] if size else PLAYER_SIZE))
 
 class MazeGame:
-    def __init__(self):
+    def __init__(self, maze_source=None, seed=None, endless=False, record=None, store=None, size=None,
+                 profile=None):
         pygame.init()
-        self.screen = pygame.display.set_mode((MAZE_WIDTH*CELL_SIZE+200, MAZE_HEIGHT*CELL_SIZE))
+        # 窗口按视口大小创建，迷宫更大时由镜头跟随玩家滚动
+        self.screen = pygame.display.set_mode((VIEW_WIDTH*CELL_SIZE+200, VIEW_HEIGHT*CELL_SIZE))
         pygame.display.set_caption('Maze Game')
         self.clock = pygame.time.Clock()
+        self.scheduler = FixedStep()
 
         # 材质URL设置
         self.path_texture_url = None
@@ -252,404 +103,345 @@ class MazeGame:
         self.goal_texture_url = None
         self.ball_texture_url = None
 
-        # 材质对象
+        # 材质对象（都是图集上的子表面）
         self.path_texture = None
         self.wall_texture = None
         self.goal_texture = None
         self.ball_texture = None
+        # 墙、地板、终点、小球和玩家精灵打包成的图集，已转换为显示格式
+        self.atlas = TextureAtlas()
 
-        # 整体背景材质
+        # 整体背景材质，烘焙迷宫分块时平铺
         self.background_texture = None
-        self.background_surface = None
-
-        # Shift键挑战相关变量
-        self.shift_counter = 0
-        self.shift_timer = 0
-        self.shift_challenge_active = False
-        self.shift_challenge_result = None
 
-        # 关卡系统
-        self.level = 1  # 初始为第1关
-
-        self.reset_game()
-
-    def reset_game(self):
-        self.maze = generate_maze(MAZE_WIDTH, MAZE_HEIGHT)
-        self.start, self.end, self.path = random_start_end(self.maze)
-        self.balls = place_balls(self.maze)
-        self.player = Player(*self.start)
-        self.fog_on = True
-        self.minimap_memory = set()
-        self.event_triggered = set()
+        # 迷宫区域渲染器（镜头 + 静态层分块缓存 + 脏矩形更新）
+        self.renderer = MazeRenderer(self.screen)
+        prerender_balls()
+        self.hud_rect = None
+
+        # 性能分析：profile 为 trace 文件路径时从启动起计时，退出时写出
+        self.profile_path = profile
+        if profile:
+            profiler.enable()
+        self.show_profile = False
+        self.profile_overlay = None
+        self.profile_updated = 0
+
+        # 游戏逻辑全部在 GameState 中，这里只负责输入、绘制和材质；
+        # 迷宫和小球都由 seed 决定，配合录下的输入可以原样重放
+        if seed is None:
+            seed = new_seed()
+        # size 为 (宽, 高) 时按这个尺寸建迷宫，不受窗口大小限制
+        width, height = size or (MAZE_WIDTH, MAZE_HEIGHT)
+        rules = Rules(width, height)
+        if endless:
+            maze_source = endless_source(width, height, seed=seed)
+        elif store:
+            # 从预生成的迷宫库（maze_store.py fill 生成）取关卡，关卡越高难度越大
+            maze_source = LevelCatalog.open(store)
+        self.state = GameState(maze_source, player_factory=Player, rules=rules, seed=seed,
+                               prefetch=LEVEL_PREFETCH, loading=self.draw_loading)
+        print(f"种子: {seed}")
+        # record 为录像文件路径，退出时写入
+        self.record_path = record
+        # 从迷宫库取关卡时，录像里记下迷宫库的路径和内容摘要，回放时重新打开
+        level_store = maze_source.store if isinstance(maze_source, LevelCatalog) else None
+        self.recorder = Recorder(seed, self.state.rules, endless, level_store) if record else None
+        self.on_reset()
+
+    def on_reset(self):
+        """新关卡：换上玩家材质，重建小地图并整屏重绘"""
+        if "player" in self.atlas:
+            self.state.player.texture = self.atlas.image("player")
+        # 开局时第一帧还没有逻辑步，起点视野要直接从记忆中画上
+        self.new_minimap()
+        self.renderer.invalidate()
+
+    def minimap_size(self):
+        """小地图的最大显示尺寸：右侧面板宽度去掉两边的边距，高度与宽度相同"""
+        size = self.screen.get_width() - self.renderer.view.right - 2*MINIMAP_MARGIN
+        return size, size
+
+    def new_minimap(self):
+        """按当前迷宫新建小地图：大迷宫按块缩小到面板以内，并画上已记住的格子"""
+        self.minimap = Minimap(self.state.maze, int(CELL_SIZE*MINIMAP_SCALE), self.minimap_size())
+        self.minimap.reveal(self.state.minimap_memory)
+
+    def on_scroll(self):
+        """无尽模式滚动后：按平移后的记忆重建小地图并整屏重绘"""
+        self.new_minimap()
+        self.renderer.invalidate()
 
     def set_textures(self, player_url=None, path_url=None, wall_url=None, goal_url=None, ball_url=None):
         """设置游戏中使用的材质URL"""
         if player_url:
-            self.player.load_texture(player_url)
+            self.state.player.texture_url = player_url
+            self.atlas.add("player", load_texture_from_url(player_url, (PLAYER_SIZE, PLAYER_SIZE),
+                                                           self.texture_setter("player")))
 
         if path_url:
             self.path_texture_url = path_url
-            self.path_texture = load_texture_from_url(path_url, (CELL_SIZE, CELL_SIZE))
-
-            # 创建整体背景
-            try:
-                # 加载原始材质
-                self.background_texture = load_texture_from_url(path_url)
-                # 创建背景表面
-                self.background_surface = pygame.Surface((MAZE_WIDTH*CELL_SIZE, MAZE_HEIGHT*CELL_SIZE))
-                # 铺满整个背景
-                for y in range(0, MAZE_HEIGHT*CELL_SIZE, self.background_texture.get_height()):
-                    for x in range(0, MAZE_WIDTH*CELL_SIZE, self.background_texture.get_width()):
-                        self.background_surface.blit(self.background_texture, (x, y))
-            except Exception as e:
-                print(f"创建背景材质失败: {e}")
+            self.atlas.add("path", load_texture_from_url(path_url, (CELL_SIZE, CELL_SIZE),
+                                                         self.texture_setter("path")))
+            # 整体背景用原始尺寸的材质平铺
+            background = load_texture_from_url(path_url, on_ready=self.build_background)
+            if background:
+                self.build_background(background)
 
         if wall_url:
             self.wall_texture_url = wall_url
-            self.wall_texture = load_texture_from_url(wall_url, (CELL_SIZE, CELL_SIZE))
+            self.atlas.add("wall", load_texture_from_url(wall_url, (CELL_SIZE, CELL_SIZE),
+                                                         self.texture_setter("wall")))
 
         if goal_url:
             self.goal_texture_url = goal_url
-            self.goal_texture = load_texture_from_url(goal_url, (CELL_SIZE, CELL_SIZE))
+            self.atlas.add("goal", load_texture_from_url(goal_url, (CELL_SIZE, CELL_SIZE),
+                                                         self.texture_setter("goal")))
 
         if ball_url:
             self.ball_texture_url = ball_url
-            self.ball_texture = load_texture_from_url(ball_url, (CELL_SIZE, CELL_SIZE))
-
-    def refresh_ball(self):
-        """刷新一个新球"""
-        path_cells = get_path_cells(self.maze)
-        # 移除已有球的位置
-        for (bx, by), _ in self.balls:
-            if (bx, by) in path_cells:
-                path_cells.remove((bx, by))
-        # 移除玩家当前位置
-        px, py = self.player.get_pos()
-        if (px, py) in path_cells:
-            path_cells.remove((px, py))
-        # 移除终点位置
-        if self.end in path_cells:
-            path_cells.remove(self.end)
-
-        if path_cells:
-            new_ball_pos = random.choice(path_cells)
-            new_ball_num = random.choice([1, 2, 3, 4])
-            self.balls.append((new_ball_pos, new_ball_num))
-            print(f"刷新新球: 位置({new_ball_pos[0]}, {new_ball_pos[1]}), 数字{new_ball_num}")
-
-    def refresh_all_balls(self):
-        """在所有可行路径上刷新满小球"""
-        # 清空现有的球
-        self.balls = []
-
-        # 获取所有路径单元格
-        path_cells = get_path_cells(self.maze)
-
-        # 移除起点和终点
-        if (self.start[0], self.start[1]) in path_cells:
-            path_cells.remove((self.start[0], self.start[1]))
-        if (self.end[0], self.end[1]) in path_cells:
-            path_cells.remove((self.end[0], self.end[1]))
-
-        # 移除玩家当前位置
-        px, py = self.player.get_pos()
-        if (px, py) in path_cells:
-            path_cells.remove((px, py))
-
-        # 在所有可行路径上放置小球，而不仅仅是4个
-        ball_numbers = []
-        for _ in range(len(path_cells)):
-            ball_numbers.append(random.choice([1, 2, 3, 4]))
-
-        # 添加新球到所有可行路径上
-        for i, pos in enumerate(path_cells):
-            self.balls.append((pos, ball_numbers[i]))
-            print(f"刷新新球: 位置({pos[0]}, {pos[1]}), 数字{ball_numbers[i]}")
-
-    def collect_all_balls(self):
-        """收��地图上所有的金色小球"""
-        for (bx, by), num in self.balls[:]:
-            self.player.collected.append(num)
-            print(f"收集到小球: {num}")
-        self.balls = []  # 清空地图上的小球列表
-        print("一键收集了地图上所有的金色小球!")
+            self.atlas.add("ball", load_texture_from_url(ball_url, (CELL_SIZE, CELL_SIZE),
+                                                         self.texture_setter("ball")))
+
+        self.apply_textures()
+
+    def texture_setter(self, name):
+        """远程材质下载完成后的回调：放进图集并重新打包"""
+        def apply(texture):
+            self.atlas.add(name, texture)
+            self.apply_textures()
+        return apply
+
+    def apply_textures(self):
+        """重新打包图集，把各材质换成图集上的子表面，并重新烘焙迷宫"""
+        self.atlas.build()
+        self.path_texture = self.atlas.image("path")
+        self.wall_texture = self.atlas.image("wall")
+        self.goal_texture = self.atlas.image("goal")
+        self.ball_texture = self.atlas.image("ball")
+        if "player" in self.atlas:
+            self.state.player.texture = self.atlas.image("player")
+        if self.ball_texture:
+            prerender_balls(self.ball_texture)
+        self.renderer.invalidate()
+
+    def build_background(self, texture):
+        """用材质铺满整个背景（烘焙各块时按迷宫坐标平铺）"""
+        try:
+            # 预先合成到黑底上并转换为显示格式，烘焙各块时只需不透明的快速 blit
+            background = pygame.Surface(texture.get_size())
+            background.blit(texture, (0, 0))
+            self.background_texture = background.convert()
+        except Exception as e:
+            print(f"创建背景材质失败: {e}")
+        self.renderer.invalidate()
+
+    def read_inputs(self):
+        """把当前按键状态和本帧的按键事件转换为一步的输入"""
+        keys = pygame.key.get_pressed()
+        move = next((direction for key, direction in MOVE_KEYS if keys[key]), None)
+        actions = []
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                actions.append(QUIT)
+            elif event.type == pygame.KEYDOWN and event.key in KEY_ACTIONS:
+                actions.append(KEY_ACTIONS[event.key])
+            elif event.type == pygame.KEYDOWN and event.key == PROFILE_KEY:
+                self.toggle_profile()
+            elif event.type == pygame.KEYDOWN and event.key == TRACE_KEY:
+                self.export_trace(self.profile_path or PROFILE_TRACE_PATH)
+        return Inputs(move, actions)
+
+    def toggle_profile(self):
+        """显示/隐藏性能面板；面板显示期间开启计时（用 --profile 启动时一直开启）"""
+        self.show_profile = not self.show_profile
+        if self.show_profile or not self.profile_path:
+            profiler.enable(self.show_profile)
+        self.profile_overlay = None
+
+    def export_trace(self, path):
+        count = profiler.export(path)
+        print(f"已导出 {count} 个计时段到 {path}")
+
+    def handle_events(self, events):
+        """响应一步中需要前端处理的事件"""
+        for name, data in events:
+            if name == "reset":
+                self.on_reset()
+            elif name == "scrolled":
+                self.on_scroll()
+            elif name == "revealed":
+                self.minimap.reveal(data)
+
+    def tick(self, inputs):
+        """跑一个固定步长的逻辑步"""
+        dt = self.scheduler.step
+        if self.recorder:
+            self.recorder.record(inputs, dt)
+        self.handle_events(self.state.step(inputs, dt))
 
     def run(self):
-        running = True
-        # Shift键挑战相关变量
-        shift_counter = 0
-        shift_timer = 0
-        shift_challenge_active = False
-        shift_challenge_result = None
-
-        # 球刷新计时器
-        ball_refresh_timer = 0
-        ball_refresh_interval = 1000  # 默认每秒刷新一个球
-
-        # 用于玩家拾取小球后的��新计时
-        ball_pickup_refresh_timer = 0
-        ball_pickup_refresh_interval = 500  # 缩短刷新时间，确保小球快速刷新
-
-        # 记录玩家是否已经达成首次收集4个球并到达终点的成就
-        first_completed = False
-
-        # 添加移动控制变量
-        move_cooldown = 100  # 移动冷却时间（毫秒）
-        last_move_time = 0   # 上次移动时间
-
-        # 确保游戏开始时有4个小球
-        while len(self.balls) < 4:
-            self.refresh_ball()
-
-        while running:
-            # 获取当前位置和可见区域
-            px, py = self.player.get_pos()
-            visible = get_visible(self.maze, px, py, VISION_RADIUS)
-            self.minimap_memory.update(visible)
-
-            # 获取当前时间
-            current_time = pygame.time.get_ticks()
-
-            # 始终确保地图上有4个小球
-            if len(self.balls) < 4:
-                self.refresh_ball()
-                print(f"当前球数量: {len(self.balls)}/4，已自动刷新")
-
-            # 持续移动逻辑：检查按键状态并移动
-            keys = pygame.key.get_pressed()
-            if current_time - last_move_time >= move_cooldown:
-                moved = False
-                # 只有在非挑战状态下或挑战结果为成功时才允许移动
-                if not shift_challenge_active and shift_challenge_result != "失败":
-                    if keys[pygame.K_w]:
-                        moved = self.player.move(0, -1, self.maze)
-                    elif keys[pygame.K_s]:
-                        moved = self.player.move(0, 1, self.maze)
-                    elif keys[pygame.K_a]:
-                        moved = self.player.move(-1, 0, self.maze)
-                    elif keys[pygame.K_d]:
-                        moved = self.player.move(1, 0, self.maze)
-
-                if moved:
-                    last_move_time = current_time
-
-            # 检查小球收集
-            for (bx, by), num in self.balls[:]:
-                if (px, py) == (bx, by):
-                    self.player.collected.append(num)
-                    self.balls.remove(((bx, by), num))
-                    print(f"收集到小球: {num}")
-
-                    # 设置小球拾取刷新计时器
-                    ball_pickup_refresh_timer = current_time
-
-            # 到达终点
-            if (px, py) == self.end:
-                if len(self.player.collected) >= 4:
-                    print("你成功收集了所有小球并到达了终点!")
-
-                    # 如果是首次完成，则清空玩家身上的球并刷新所有路径上的球
-                    if not first_completed:
-                        first_completed = True
-                        self.player.collected = []  # 清空玩家身上的球
-                        self.refresh_all_balls()    # 刷新所有路径上的球
-                        print("首次完成任务！已在所有路径上刷新满小球")
-                    else:
-                        # 第二次完成任务时，关卡递增并刷新迷宫
-                        self.level += 1  # 关卡递增
-                        print(f"恭喜通过第{self.level-1}关！进入第{self.level}关")
-                        self.reset_game()  # 重置游戏，生成新迷宫
-                        self.player.collected = []  # 清空玩家身上的球
-                        first_completed = False  # 重置首次完成标志
-                else:
-                    print("你到达了终点，但没有收集齐所有小球")
-
-            # 处理小球拾���后的刷新
-            if current_time - ball_pickup_refresh_timer >= ball_pickup_refresh_interval and first_completed:
-                ball_pickup_refresh_timer = current_time
-                # 只有当球的数量少于4个时才刷新
-                if len(self.balls) < 4:
-                    self.refresh_ball()
-                    print("小球拾取3秒后，刷新了一个新球")
-
-            # 死角事件处理 - 添加Shift键挑战
-            if (px, py) in find_dead_ends(self.maze) and (px, py) not in self.event_triggered:
-                self.event_triggered.add((px, py))
-                # 启动shift按键挑战
-                print(f"死角事件触发: 位置({px},{py})! 请在3秒内连续按击5次shift键!")
-                shift_challenge_active = True
-                shift_counter = 0
-                shift_timer = pygame.time.get_ticks()  # 记录开始时间
-                shift_challenge_result = None  # 重置挑战结果
-
-            # 处理shift按键挑战
-            if shift_challenge_active:
-                current_time = pygame.time.get_ticks()
-                # 检查是否超过3秒
-                if current_time - shift_timer > 3000:
-                    shift_challenge_active = False
-                    if shift_counter >= 5:
-                        print("挑战成功!")
-                        shift_challenge_result = "成功"
-                    else:
-                        print(f"挑战失败! 你只按了{shift_counter}次shift键，未达到5次。")
-                        shift_challenge_result = "失败"
-                        print("*你死了*")
-                        running = False  # 挑战失败，退出游戏
-
-            # 处理玩家输入
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-                elif event.type == pygame.KEYDOWN:
-                    # 处理shift按键挑战
-                    if shift_challenge_active and (event.key == pygame.K_LSHIFT or event.key == pygame.K_RSHIFT):
-                        shift_counter += 1
-                        print(f"按键次数: {shift_counter}/10")
-
-                    if event.key == pygame.K_l:
-                        self.level += 1  # 设置为最大关卡
-                    if event.key == pygame.K_r:
-                        self.level -= 1
-                    # 雾模式切换
-                    if event.key == pygame.K_f:
-                        self.fog_on = not self.fog_on
-
-                    # 穿墙模式切换
-                    elif event.key == pygame.K_g:
-                        self.player.ghost_mode = not self.player.ghost_mode
-                        if self.player.ghost_mode:
-                            print("穿墙模式已开启")
-                        else:
-                            print("穿墙模式已关闭")
-
-                    # 一键收集所有小球
-                    elif event.key == pygame.K_o:
-                        self.collect_all_balls()
-
-            self.draw()
-            self.clock.tick(30)
-
+        # 逻辑按固定步长推进，绘制按 RENDER_FPS；绘制卡顿时一帧补跑多步逻辑
+        self.scheduler.reset()
+        elapsed = 0
+        pending = []
+        while self.state.running:
+            with profiler.scope("input"):
+                # 换上后台加载完成的材质
+                texture_loader.poll()
+
+                # 本帧的按键事件只交给第一个逻辑步；本帧没有逻辑步时留到下一帧
+                inputs = self.read_inputs()
+                pending.extend(inputs.actions)
+
+            with profiler.scope("logic"):
+                for _ in range(self.scheduler.advance(elapsed)):
+                    self.tick(Inputs(inputs.move, pending))
+                    pending = []
+                    if not self.state.running:
+                        break
+
+            # 分帧预建下一关，每帧最多占用 LEVEL_BUILD_BUDGET 毫秒
+            with profiler.scope("prefetch"):
+                self.state.levels.work(LEVEL_BUILD_BUDGET)
+
+            with profiler.scope("draw"):
+                self.draw()
+            with profiler.scope("wait"):
+                elapsed = self.clock.tick(RENDER_FPS)
+            profiler.frame()
+
+        if self.recorder:
+            size = self.recorder.save(self.record_path, self.state)
+            print(f"录像已保存到 {self.record_path}（{size} 字节）")
+        if self.profile_path:
+            print(profiler.report())
+            self.export_trace(self.profile_path)
+        self.state.close()
+        texture_loader.shutdown()
         pygame.quit()
 
-    def draw(self):
-        """绘制游戏界面"""
+    def draw_loading(self, build):
+        """建关时的加载动画：缩放显示正在挖的迷宫，下方是进度条"""
         self.screen.fill(BLACK)
+        area_w, area_h = VIEW_WIDTH*CELL_SIZE, VIEW_HEIGHT*CELL_SIZE - 60
+        maze = build.maze
+        if maze is not None:
+            # 迷宫每格一字节（0 路、1 墙），直接当作 8 位调色板图像
+            image = pygame.image.frombuffer(maze.cells, (maze.width, maze.height), "P")
+            image.set_palette([GRAY, DARK])
+            scale = min(area_w / maze.width, area_h / maze.height)
+            size = (int(maze.width*scale), int(maze.height*scale))
+            self.screen.blit(pygame.transform.scale(image, size), ((area_w - size[0]) // 2, 0))
+        bar = pygame.Rect(20, area_h + 20, area_w - 40, 20)
+        pygame.draw.rect(self.screen, GRAY, bar, 2)
+        self.screen.fill(GREEN, (bar.x, bar.y, int(bar.width*build.progress), bar.height))
+        text = render_text(f"Loading {int(build.progress*100)}%", WHITE, 36)
+        self.screen.blit(text, (area_w + 20, area_h + 12))
+        pygame.display.flip()
+        # 加载期间也要处理窗口消息，否则系统会认为程序无响应
+        pygame.event.pump()
 
-        # 绘制整体背景
-        if self.background_surface:
-            self.screen.blit(self.background_surface, (0, 0))
-
-        # 获取玩家位置和可见区域
-        px, py = self.player.get_pos()
-        visible = get_visible(self.maze, px, py, VISION_RADIUS)
-
-        # 绘制主迷宫
-        for y in range(MAZE_HEIGHT):
-            for x in range(MAZE_WIDTH):
-                rect = (x*CELL_SIZE, y*CELL_SIZE, CELL_SIZE, CELL_SIZE)
-                if not self.fog_on or (x, y) in visible:
-                    if self.maze[y][x] == PATH:
-                        if self.path_texture:
-                            self.screen.blit(self.path_texture, rect)
-                        else:
-                            pygame.draw.rect(self.screen, WHITE, rect)
-                    else:
-                        if self.wall_texture:
-                            self.screen.blit(self.wall_texture, rect)
-                        else:
-                            pygame.draw.rect(self.screen, GRAY, rect)
-                else:
-                    pygame.draw.rect(self.screen, DARK, rect)
-
-        # 绘制终点
-        if not self.fog_on or self.end in visible:
-            if self.goal_texture:
-                self.screen.blit(self.goal_texture, (self.end[0]*CELL_SIZE, self.end[1]*CELL_SIZE))
-            else:
-                pygame.draw.rect(self.screen, RED, (self.end[0]*CELL_SIZE, self.end[1]*CELL_SIZE, CELL_SIZE, CELL_SIZE))
-
-        # 绘制小球
-        for (bx, by), num in self.balls:
-            if not self.fog_on or (bx, by) in visible:
-                if self.ball_texture:
-                    self.screen.blit(self.ball_texture, (bx*CELL_SIZE, by*CELL_SIZE))
-                else:
-                    pygame.draw.circle(self.screen, YELLOW,
-                                     (bx*CELL_SIZE+CELL_SIZE//2, by*CELL_SIZE+CELL_SIZE//2), CELL_SIZE//3)
+    def draw(self):
+        """绘制游戏界面：迷宫区域只重绘变化的格子，右侧面板每帧重绘"""
+        # 可见区域由 GameState 在逻辑步中更新，这里只读
+        state = self.state
 
-                font = pygame.font.SysFont(None, 24)
-                img = font.render(str(num), True, BLUE)
-                self.screen.blit(img, (bx*CELL_SIZE+CELL_SIZE//2-8, by*CELL_SIZE+CELL_SIZE//2-12))
+        # 绘制主迷宫（镜头内的静态层 + 脏格子）
+        with profiler.scope("maze"):
+            rects = self.renderer.render(self, state.vision)
 
-        # 绘制玩家
-        self.player.draw(self.screen)
+            # 右侧面板的文字和已收集小球会压到迷宫上，先恢复上一帧被压住的格子
+            if rects is not None and self.hud_rect:
+                rects.extend(self.renderer.redraw_area(self, self.hud_rect))
 
         # 绘制小地图
-        self.draw_minimap()
-
-        pygame.display.flip()
+        with profiler.scope("minimap"):
+            maze_w = self.renderer.view.right
+            panel = pygame.Rect(maze_w, 0, self.screen.get_width()-maze_w, self.screen.get_height())
+            self.screen.fill(BLACK, panel)
+            self.hud_rect = self.draw_minimap()
+
+        # 性能面板画在右侧面板底部，随面板一起每帧重绘
+        if self.show_profile:
+            self.draw_profile(panel)
+
+        with profiler.scope("present"):
+            if rects is None:
+                pygame.display.flip()
+            else:
+                rects.append(panel.union(self.hud_rect))
+                pygame.display.update(rects)
+
+    def draw_profile(self, panel):
+        """性能面板：最近各帧帧时间的 p50/p95/p99 和各阶段平均耗时，每 PROFILE_OVERLAY_INTERVAL 毫秒刷新一次"""
+        now = pygame.time.get_ticks()
+        if self.profile_overlay is None or now - self.profile_updated >= PROFILE_OVERLAY_INTERVAL:
+            self.profile_updated = now
+            stats = profiler.percentiles()
+            if stats is None:
+                lines = [("Profiling...", WHITE)]
+            else:
+                lines = [(f"p50 {stats[0]:5.1f} ms", WHITE), (f"p95 {stats[1]:5.1f} ms", YELLOW),
+                         (f"p99 {stats[2]:5.1f} ms", RED)]
+                lines += [(f"{name:<9}{ms:6.2f}", GRAY) for name, ms in profiler.phases()]
+            # 数字每次都不同，直接用字体渲染，不进文字缓存
+            font = get_font(None, 20)
+            images = [font.render(text, True, color) for text, color in lines]
+            overlay = pygame.Surface((panel.width - 2*MINIMAP_MARGIN, 16*len(images) + 8))
+            overlay.fill(DARK)
+            for i, image in enumerate(images):
+                overlay.blit(image, (4, 4 + 16*i))
+            self.profile_overlay = overlay
+        overlay = self.profile_overlay
+        self.screen.blit(overlay, (panel.x + MINIMAP_MARGIN, panel.bottom - overlay.get_height() - MINIMAP_MARGIN))
 
     def draw_minimap(self):
-        """绘制小地图"""
-        minimap_w = int(MAZE_WIDTH*MINIMAP_SCALE)
-        minimap_h = int(MAZE_HEIGHT*MINIMAP_SCALE)
-        minimap_s = int(CELL_SIZE*MINIMAP_SCALE)
-        minimap_x = MAZE_WIDTH*CELL_SIZE + MINIMAP_MARGIN
+        """绘制小地图，返回已收集小球和关卡文字占用的区域（可能越过面板左边界）"""
+        minimap_w, minimap_h = self.minimap.size
+        minimap_x = self.renderer.view.right + MINIMAP_MARGIN
         minimap_y = MINIMAP_MARGIN
+        state = self.state
 
         # 小地图边框
         pygame.draw.rect(self.screen, GRAY, (minimap_x-2, minimap_y-2,
-                                           minimap_w*minimap_s+4, minimap_h*minimap_s+4), 2)
-
-        # 小地图内容
-        for y in range(MAZE_HEIGHT):
-            for x in range(MAZE_WIDTH):
-                if (x, y) in self.minimap_memory:
-                    color = WHITE if self.maze[y][x] == PATH else GRAY
-                    pygame.draw.rect(self.screen, color,
-                                   (minimap_x+x*minimap_s, minimap_y+y*minimap_s, minimap_s, minimap_s))
-
-        # 小地图终点
-        pygame.draw.rect(self.screen, RED,
-                       (minimap_x+self.end[0]*minimap_s, minimap_y+self.end[1]*minimap_s, minimap_s, minimap_s))
-
-        # 小地图玩家
-        px, py = self.player.get_pos()
-        mini_player_size = max(2, int(minimap_s - 2))
-        mini_px = minimap_x + px * minimap_s + (minimap_s - mini_player_size) // 2
-        mini_py = minimap_y + py * minimap_s + (minimap_s - mini_player_size) // 2
-        pygame.draw.rect(self.screen, GREEN, (mini_px, mini_py, mini_player_size, mini_player_size))
-
-        # 小地图小球
-        for (bx, by), num in self.balls:
-            pygame.draw.circle(self.screen, YELLOW,
-                             (minimap_x+bx*minimap_s+minimap_s//2, minimap_y+by*minimap_s+minimap_s//2),
-                             max(2, minimap_s//3))
+                                           minimap_w+4, minimap_h+4), 2)
+
+        # 小地图底图（只含已揭示的格子）和持久的小球层各一次 blit，终点和玩家直接画
+        self.minimap.draw(self.screen, (minimap_x, minimap_y), state.end, state.player.get_pos(), state.balls)
 
         # 显示已收集小球
-        font = pygame.font.SysFont(None, 28)
-        for i, num in enumerate(sorted(self.player.collected)):
-            pygame.draw.circle(self.screen, YELLOW,
-                             (minimap_x+minimap_w*minimap_s//2-40+i*40, minimap_y+minimap_h*minimap_s+30), 16)
-            img = font.render(str(num), True, BLUE)
-            self.screen.blit(img, (minimap_x+minimap_w*minimap_s//2-48+i*40+8, minimap_y+minimap_h*minimap_s+18))
+        drawn = []
+        for i, num in enumerate(sorted(state.player.collected)):
+            drawn.append(pygame.draw.circle(self.screen, YELLOW,
+                             (minimap_x+minimap_w//2-40+i*40, minimap_y+minimap_h+30), 16))
+            img = render_text(str(num), BLUE, 28)
+            self.screen.blit(img, (minimap_x+minimap_w//2-48+i*40+8, minimap_y+minimap_h+18))
 
         # 显示当前关卡
-        level_font = pygame.font.SysFont(None, 36)
-        level_text = f"The Number {self.level} "
-        level_img = level_font.render(level_text, True, WHITE)
+        level_text = f"The Number {state.level} "
+        level_img = render_text(level_text, WHITE, 36)
         # 在小地图下方居中显示关卡文本
-        level_x = minimap_x + (minimap_w * minimap_s - level_img.get_width()) // 2
-        level_y = minimap_y + minimap_h * minimap_s + 60  # 在球的显示下方
-        self.screen.blit(level_img, (level_x, level_y))
-
-def main(player_texture=None, path_texture=None, wall_texture=None, goal_texture=None, ball_texture=None):
-    """入口函数，支持设置各种材质URL"""
-    game = MazeGame()
+        level_x = minimap_x + (minimap_w - level_img.get_width()) // 2
+        level_y = minimap_y + minimap_h + 60  # 在球的显示下方
+        drawn.append(self.screen.blit(level_img, (level_x, level_y)))
+        return drawn[0].unionall(drawn[1:])
+
+def main(player_texture=None, path_texture=None, wall_texture=None, goal_texture=None, ball_texture=None,
+         endless=False, seed=None, record=None, store=None, size=None, profile=None):
+    """入口函数，支持设置各种材质URL；endless 为 True 时使用逐行生成的无尽迷宫，
+    seed 指定本局种子，record 为录像文件路径（可用 replay.py 回放），store 为迷宫库文件路径，
+    size 为迷宫尺寸 (宽, 高)，profile 为性能 trace 文件路径（开启计时，退出时写出）"""
+    game = MazeGame(seed=seed, endless=endless, record=record, store=store, size=size, profile=profile)
     game.set_textures(player_texture, path_texture, wall_texture, goal_texture, ball_texture)
     game.run()
 
+def arg_value(name):
+    """读取形如 --name value 的命令行参数，没有时返回 None"""
+    if name in sys.argv[:-1]:
+        return sys.argv[sys.argv.index(name) + 1]
+    return None
+
 if __name__ == "__main__":
     # 使用本地texture目录下的材质
     current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -661,12 +453,24 @@ if __name__ == "__main__":
     textures_exist = os.path.exists(wall_texture) and os.path.exists(floor_texture)
     player_exists = os.path.exists(player_texture)
 
+    # 命令行参数 --endless 开启无尽模式，--seed N 指定种子，--record 文件 录制本局输入，
+    # --store 文件 从迷宫库取关卡，--size 宽x高 指定迷宫尺寸（可以比窗口大），
+    # --profile 文件 开启性能计时并在退出时导出 Chrome trace
+    endless = "--endless" in sys.argv
+    seed = int(arg_value("--seed")) if arg_value("--seed") else None
+    record = arg_value("--record")
+    store = arg_value("--store")
+    size = tuple(map(int, arg_value("--size").split("x"))) if arg_value("--size") else None
+    profile = arg_value("--profile")
+
     if textures_exist and player_exists:
         print(f"使用本地材质: 墙壁、地板和玩家")
-        main(player_texture, floor_texture, wall_texture)
+        main(player_texture, floor_texture, wall_texture,
+             endless=endless, seed=seed, record=record, store=store, size=size, profile=profile)
     elif textures_exist:
         print(f"使用本地材质: 墙壁和地板")
-        main(None, floor_texture, wall_texture)
+        main(None, floor_texture, wall_texture,
+             endless=endless, seed=seed, record=record, store=store, size=size, profile=profile)
     else:
         print("本地材质文件不存在，使用默认渲染")
-        main()
+        main(endless=endless, seed=seed, record=record, store=store, size=size, profile=profile)
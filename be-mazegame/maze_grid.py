@@ -0,0 +1,91 @@
+WALL = 1
+PATH = 0
+
+
+class MazeGrid:
+    """紧凑迷宫网格：按行优先存放在一个 bytearray 中，每格一个字节"""
+
+    __slots__ = ("width", "height", "cells")
+
+    def __init__(self, width, height, fill=WALL, cells=None):
+        self.width = width
+        self.height = height
+        if cells is None:
+            self.cells = bytearray([fill]) * (width * height)
+        else:
+            if len(cells) != width * height:
+                raise ValueError("网格数据长度与尺寸不符")
+            self.cells = bytearray(cells)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """从列表嵌套列表构建网格（兼容旧格式）"""
+        height = len(rows)
+        width = len(rows[0]) if height else 0
+        cells = bytearray()
+        for row in rows:
+            cells.extend(row)
+        return cls(width, height, cells=cells)
+
+    def to_rows(self):
+        """导出为列表嵌套列表（仅用于调试或兼容旧代码）"""
+        w = self.width
+        return [list(self.cells[y*w:(y+1)*w]) for y in range(self.height)]
+
+    def copy(self):
+        return MazeGrid(self.width, self.height, cells=self.cells)
+
+    def index(self, x, y):
+        """坐标转一维下标"""
+        return y * self.width + x
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def get(self, x, y):
+        return self.cells[y * self.width + x]
+
+    def set(self, x, y, value):
+        self.cells[y * self.width + x] = value
+
+    def is_path(self, x, y):
+        """越界视为墙"""
+        return 0 <= x < self.width and 0 <= y < self.height and self.cells[y * self.width + x] == PATH
+
+    def row(self, y):
+        """返回第 y 行的零拷贝视图（memoryview）"""
+        start = y * self.width
+        return memoryview(self.cells)[start:start + self.width]
+
+    def count(self, kind):
+        return self.cells.count(kind)
+
+    def cells_of(self, kind):
+        """批量查询某种类型的所有格子，返回 (x, y) 列表"""
+        w = self.width
+        cells = self.cells
+        needle = bytes([kind])
+        result = []
+        i = cells.find(needle)
+        while i != -1:
+            result.append((i % w, i // w))
+            i = cells.find(needle, i + 1)
+        return result
+
+    def indices_of(self, kind):
+        """同 cells_of，但返回一维下标，省去元组分配"""
+        cells = self.cells
+        needle = bytes([kind])
+        result = []
+        i = cells.find(needle)
+        while i != -1:
+            result.append(i)
+            i = cells.find(needle, i + 1)
+        return result
+
+    def __eq__(self, other):
+        return (isinstance(other, MazeGrid) and self.width == other.width
+                and self.height == other.height and self.cells == other.cells)
+
+    def __repr__(self):
+        return f"MazeGrid({self.width}x{self.height})"
@@ -0,0 +1,231 @@
+"""迷宫库：预先生成的关卡存成一个文件，游戏中经 mmap 按需读取，不必现场生成
+
+文件格式（小端）：
+    头部    b"MZST"、版本号 u32、迷宫数 u32、保留 u32，共 16 字节
+    偏移表  每个迷宫一个 u64，为记录在文件中的起始位置
+    记录    宽 u16、高 u16、起点 x/y u16、终点 x/y u16、解路步数 u32、小球数 u8，
+            每个小球 x/y u16、数字 u8，然后是墙位：
+            对每一行格点，先是 cw-1 个向右的边，再是（最后一行除外）cw 个向下的边，
+            每条边 1 位（1 为墙），每段单独补齐到整字节，解码时可以整段切片写回网格
+
+只能保存 maze_gen 生成的格点结构迷宫：奇数坐标的格点都是路，偶数坐标交点都是墙。
+
+用法：
+    python maze_store.py fill levels.mzs -n 10000 -j 4
+    python maze_store.py info levels.mzs
+"""
+import argparse
+import hashlib
+import mmap
+import multiprocessing
+import random
+import struct
+import time
+
+from maze_grid import MazeGrid, WALL, PATH
+from maze_gen import generate_maze, GENERATORS
+from maze_tree import build_tree_index
+from cell_sampler import FreeCellSampler
+from level import get_path_cells, random_start_end, place_balls
+from settings import MAZE_WIDTH, MAZE_HEIGHT, MIN_PATH_LENGTH
+
+MAGIC = b"MZST"
+VERSION = 1
+HEADER = struct.Struct("<4sIII")
+OFFSET = struct.Struct("<Q")
+RECORD = struct.Struct("<HHHHHHIB")
+BALL = struct.Struct("<HHB")
+
+# 一个字节展开成 8 个 0/1 字节（高位在前），0/1 正好就是 PATH/WALL
+_UNPACK = [bytes((b >> (7 - k)) & 1 for k in range(8)) for b in range(256)]
+_TO_DIGITS = bytes.maketrans(bytes([PATH, WALL]), b"01")
+
+
+def _pack(bits):
+    """一串 0/1 字节打包成位，补齐到整字节"""
+    if not bits:
+        return b""
+    digits = bytes(bits).translate(_TO_DIGITS)
+    digits += b"0" * (-len(digits) % 8)
+    return int(digits, 2).to_bytes(len(digits) // 8, "big")
+
+
+def _unpack(data, count):
+    return b"".join(map(_UNPACK.__getitem__, data))[:count]
+
+
+def encode_level(maze, start, end, path_len, balls):
+    """把一关编码成一条记录；迷宫不是格点结构时抛出 ValueError"""
+    w, h = maze.width, maze.height
+    cw, ch = w // 2, h // 2
+    cells = maze.cells
+    out = bytearray(RECORD.pack(w, h, start[0], start[1], end[0], end[1], path_len, len(balls)))
+    for (x, y), num in balls:
+        out += BALL.pack(x, y, num)
+    for j in range(ch):
+        row = (2*j + 1)*w
+        out += _pack(cells[row + 2:row + 2*cw - 1:2])
+        if j < ch - 1:
+            out += _pack(cells[row + w + 1:row + w + 2*cw:2])
+    if decode_maze(out, 0)[0].cells != cells:
+        raise ValueError("只能保存格点结构的完美迷宫")
+    return bytes(out)
+
+
+def decode_maze(buf, offset):
+    """从 buf 的 offset 处解码迷宫，返回 (MazeGrid, 记录头)"""
+    head = RECORD.unpack_from(buf, offset)
+    w, h = head[0], head[1]
+    cw, ch = w // 2, h // 2
+    pos = offset + RECORD.size + head[7] * BALL.size
+    east_bytes, south_bytes = (cw + 6) // 8, (cw + 7) // 8
+    cells = bytearray([WALL]) * (w * h)
+    path_cells = bytes([PATH]) * cw
+    for j in range(ch):
+        row = (2*j + 1)*w
+        cells[row + 1:row + 2*cw:2] = path_cells
+        cells[row + 2:row + 2*cw - 1:2] = _unpack(buf[pos:pos + east_bytes], cw - 1)
+        pos += east_bytes
+        if j < ch - 1:
+            cells[row + w + 1:row + w + 2*cw:2] = _unpack(buf[pos:pos + south_bytes], cw)
+            pos += south_bytes
+    return MazeGrid(w, h, cells=cells), head
+
+
+def write_store(path, records, count):
+    """按顺序写入 count 条记录（encode_level 的结果）"""
+    table = HEADER.size
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, count, 0))
+        f.write(bytes(OFFSET.size * count))
+        offsets = []
+        for record in records:
+            offsets.append(f.tell())
+            f.write(record)
+        if len(offsets) != count:
+            raise ValueError(f"应写入 {count} 个迷宫，实际 {len(offsets)} 个")
+        f.seek(table)
+        f.write(b"".join(OFFSET.pack(o) for o in offsets))
+
+
+class MazeStore:
+    """只读打开的迷宫库：整个文件 mmap 映射，取某一关时只解码这一条记录"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.buf = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, _ = HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} 不是迷宫库文件")
+        if version != VERSION:
+            raise ValueError(f"不支持的迷宫库版本: {version}")
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def offset(self, i):
+        if not 0 <= i < self.count:
+            raise IndexError(f"迷宫库中没有第 {i} 个迷宫")
+        return OFFSET.unpack_from(self.buf, HEADER.size + i * OFFSET.size)[0]
+
+    def info(self, i):
+        """不解码墙位，只读第 i 个迷宫的 (宽, 高, 起点, 终点, 解路步数)"""
+        w, h, sx, sy, ex, ey, path_len, _ = RECORD.unpack_from(self.buf, self.offset(i))
+        return w, h, (sx, sy), (ex, ey), path_len
+
+    def read(self, i):
+        """第 i 关：(迷宫, 起点, 终点, 小球列表 [((x, y), 数字), ...])"""
+        offset = self.offset(i)
+        maze, (_, _, sx, sy, ex, ey, _, n) = decode_maze(self.buf, offset)
+        pos = offset + RECORD.size
+        balls = []
+        for k in range(n):
+            x, y, num = BALL.unpack_from(self.buf, pos + k * BALL.size)
+            balls.append(((x, y), num))
+        return maze, (sx, sy), (ex, ey), balls
+
+    def digest(self):
+        """整个文件内容的 SHA-256，录像用它确认回放时的迷宫库与录制时相同"""
+        return hashlib.sha256(self.buf).digest()
+
+    def pick(self, rng, level=None):
+        """随机取一关（不区分难度，level 只为与 LevelCatalog.pick 接口一致）"""
+        return self.read(rng.randrange(self.count))
+
+    def close(self):
+        self.buf.close()
+        self.file.close()
+
+
+def make_record(job):
+    """按种子生成一关并编码（在进程池中运行）"""
+    seed, width, height, algorithm, min_path_length = job
+    rng = random.Random(seed)
+    maze = generate_maze(width, height, algorithm, rng=rng)
+    tree = build_tree_index(maze)
+    start, end, path = random_start_end(maze, min_path_length, tree, rng)
+    free_cells = FreeCellSampler(get_path_cells(maze))
+    free_cells.reserve(start)
+    free_cells.reserve(end)
+    balls = place_balls(maze, tree, free_cells, rng)
+    return encode_level(maze, start, end, len(path) - 1, balls)
+
+
+def fill(args):
+    jobs = [(args.seed + i, args.width, args.height, args.algorithm, args.min_path)
+            for i in range(args.count)]
+    processes = args.jobs or multiprocessing.cpu_count()
+    chunksize = max(1, args.count // (processes * 8))
+    started = time.perf_counter()
+    with multiprocessing.Pool(processes) as pool:
+        # imap 保持顺序，同样的参数总是得到同样的文件
+        write_store(args.path, pool.imap(make_record, jobs, chunksize), args.count)
+    elapsed = time.perf_counter() - started
+    print(f"写入 {args.count} 个迷宫到 {args.path}，用时 {elapsed:.1f}s"
+          f"（{args.count / max(elapsed, 1e-9):.0f} 个/秒）")
+
+
+def info(args):
+    store = MazeStore(args.path)
+    n = len(store)
+    sizes = {}
+    for i in range(n):
+        w, h = store.info(i)[:2]
+        sizes[w, h] = sizes.get((w, h), 0) + 1
+    print(f"{args.path}: {n} 个迷宫，{len(store.buf)} 字节")
+    for (w, h), k in sorted(sizes.items()):
+        print(f"  {w}x{h}: {k} 个")
+    if n:
+        rng = random.Random(0)
+        rounds = min(1000, n * 10)
+        started = time.perf_counter()
+        for _ in range(rounds):
+            store.pick(rng)
+        print(f"随机读取一关平均 {(time.perf_counter() - started) / rounds * 1e6:.1f} 微秒")
+    store.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="预生成迷宫库")
+    commands = parser.add_subparsers(dest="command", required=True)
+    p = commands.add_parser("fill", help="并行生成迷宫并写入迷宫库")
+    p.add_argument("path")
+    p.add_argument("-n", "--count", type=int, default=1000, help="迷宫数")
+    p.add_argument("-j", "--jobs", type=int, default=None, help="进程数，默认 CPU 核数")
+    p.add_argument("--seed", type=int, default=0, help="第 i 个迷宫使用种子 seed+i")
+    p.add_argument("--width", type=int, default=MAZE_WIDTH)
+    p.add_argument("--height", type=int, default=MAZE_HEIGHT)
+    p.add_argument("--algorithm", choices=sorted(GENERATORS), default="backtracker")
+    p.add_argument("--min-path", type=int, default=MIN_PATH_LENGTH, help="起点到终点的最短解路步数")
+    p.set_defaults(func=fill)
+    p = commands.add_parser("info", help="查看迷宫库内容并测量读取速度")
+    p.add_argument("path")
+    p.set_defaults(func=info)
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import random
+import tempfile
+
+from maze_grid import MazeGrid, WALL, PATH
+
+
+def eller_rows(width, rng=None, height=None):
+    """Eller 算法逐行生成迷宫（每次产出一行 bytes），内存只与一行宽度成正比
+
+    height 为 None 时无限生成；否则最后一行合并所有集合，得到完美迷宫。
+    """
+    if rng is None:
+        rng = random.Random()
+    cw = width // 2
+    ch = None if height is None else height // 2
+    wall_row = bytes([WALL]) * width
+    yield wall_row
+    if cw == 0:
+        while height is None:
+            yield wall_row
+        for _ in range(height - 1):
+            yield wall_row
+        return
+
+    sets = [0] * cw
+    next_id = 1
+    j = 0
+    while ch is None or j < ch:
+        last = ch is not None and j == ch - 1
+        # 没有从上一行连下来的格子各自成为新集合
+        for i in range(cw):
+            if not sets[i]:
+                sets[i] = next_id
+                next_id += 1
+
+        # 横向随机合并相邻的不同集合（行内并查集）
+        parent = {}
+
+        def find(s):
+            while s in parent:
+                s = parent[s]
+            return s
+
+        row = bytearray(wall_row)
+        row[1:2*cw:2] = bytes([PATH]) * cw
+        for i in range(cw - 1):
+            a, b = find(sets[i]), find(sets[i + 1])
+            if a != b and (last or rng.random() < 0.5):
+                parent[b] = a
+                row[2*i + 2] = PATH
+        sets = [find(s) for s in sets]
+        yield bytes(row)
+        if last:
+            break
+
+        # 纵向：每个集合至少向下打通一格
+        below = bytearray(wall_row)
+        next_sets = [0] * cw
+        members = {}
+        for i, s in enumerate(sets):
+            members.setdefault(s, []).append(i)
+        for s, idx in members.items():
+            down = [i for i in idx if rng.random() < 0.5]
+            if not down:
+                down = [idx[rng.randrange(len(idx))]]
+            for i in down:
+                below[2*i + 1] = PATH
+                next_sets[i] = s
+        yield bytes(below)
+        sets = next_sets
+        j += 1
+
+    for _ in range(height - 2*ch):
+        yield wall_row
+
+
+class StreamingMaze(MazeGrid):
+    """无尽迷宫的滚动窗口：窗口只保留 height 行，滚出顶部的行被淘汰，可选溢写到磁盘"""
+
+    __slots__ = ("rows", "origin", "spill")
+
+    def __init__(self, width, height, rows, spill=None):
+        cells = bytearray()
+        for _ in range(height):
+            cells.extend(next(rows))
+        super().__init__(width, height, cells=cells)
+        self.rows = rows
+        # 窗口第 0 行在整个无尽迷宫中的行号
+        self.origin = 0
+        if spill is True:
+            self.spill = tempfile.TemporaryFile()
+        elif spill:
+            self.spill = open(spill, "w+b")
+        else:
+            self.spill = None
+
+    def scroll(self, count):
+        """窗口向下滚动 count 行，返回实际滚动的行数"""
+        w = self.width
+        fresh = bytearray()
+        scrolled = 0
+        for row in self.rows:
+            fresh.extend(row)
+            scrolled += 1
+            if scrolled == count:
+                break
+        if not scrolled:
+            return 0
+        if self.spill is not None:
+            self.spill.write(self.cells[:scrolled*w])
+        del self.cells[:scrolled*w]
+        self.cells.extend(fresh)
+        self.origin += scrolled
+        return scrolled
+
+    def evicted_row(self, world_y):
+        """从溢写文件读回已滚出窗口的一行"""
+        if self.spill is None or not 0 <= world_y < self.origin:
+            raise IndexError(f"第 {world_y} 行不在溢写文件中")
+        self.spill.seek(world_y * self.width)
+        data = self.spill.read(self.width)
+        self.spill.seek(0, 2)
+        return data
+
+    def close(self):
+        if self.spill is not None:
+            self.spill.close()
+            self.spill = None
+
+
+def endless_source(width, height, seed=None, spill=None):
+    """返回无尽模式的迷宫数据源，供 MazeGame.reset_game 使用"""
+    rng = random.Random(seed)
+
+    def source():
+        rows = eller_rows(width, random.Random(rng.getrandbits(64)))
+        return StreamingMaze(width, height, rows, spill)
+
+    return source
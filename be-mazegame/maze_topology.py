@@ -0,0 +1,104 @@
+from maze_grid import WALL, PATH
+from maze_gen import SLICE
+
+
+class TopologyIndex:
+    """迷宫拓扑索引：每格的通路度数和死胡同位图，死胡同判断 O(1)
+
+    与原 find_dead_ends 一致，只有不在边框上的路格才可能算作死胡同。
+    迷宫被修改时调用 set_cell，只更新该格及其四邻。
+    """
+
+    def __init__(self, maze):
+        self.maze = maze
+        self.width = maze.width
+        self.height = maze.height
+        for _ in self._build():
+            pass
+
+    @classmethod
+    def build_steps(cls, maze):
+        """分段建索引：每处理约 SLICE 个路格产出一次进度（0~1），结束时返回索引"""
+        index = cls.__new__(cls)
+        index.maze = maze
+        index.width = maze.width
+        index.height = maze.height
+        yield from index._build()
+        return index
+
+    def _build(self):
+        cells = self.maze.cells
+        size = len(cells)
+        self.degree = bytearray(size)
+        self.dead_end = bytearray(size)
+        total = max(1, cells.count(PATH))
+        needle = bytes([PATH])
+        done = 0
+        i = cells.find(needle)
+        while i != -1:
+            self._refresh(i)
+            done += 1
+            if not done % SLICE:
+                yield done / total
+            i = cells.find(needle, i + 1)
+
+    def _neighbours(self, i):
+        w = self.width
+        x = i % w
+        if x > 0:
+            yield i - 1
+        if x < w - 1:
+            yield i + 1
+        if i >= w:
+            yield i - w
+        if i + w < len(self.degree):
+            yield i + w
+
+    def _refresh(self, i):
+        cells = self.maze.cells
+        if cells[i] != PATH:
+            self.degree[i] = 0
+            self.dead_end[i] = 0
+            return
+        deg = 0
+        for j in self._neighbours(i):
+            if cells[j] == PATH:
+                deg += 1
+        self.degree[i] = deg
+        w, h = self.width, self.height
+        x, y = i % w, i // w
+        self.dead_end[i] = deg == 1 and 0 < x < w - 1 and 0 < y < h - 1
+
+    def is_dead_end(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height and self.dead_end[y*self.width + x] == 1
+
+    def degree_of(self, x, y):
+        return self.degree[y*self.width + x]
+
+    def dead_ends(self):
+        """所有死胡同坐标（行优先顺序）"""
+        w = self.width
+        flags = self.dead_end
+        result = []
+        i = flags.find(1)
+        while i != -1:
+            result.append((i % w, i // w))
+            i = flags.find(1, i + 1)
+        return result
+
+    def count_dead_ends(self):
+        return self.dead_end.count(1)
+
+    def set_cell(self, x, y, value):
+        """修改迷宫中的一格并增量更新索引"""
+        i = y*self.width + x
+        self.maze.cells[i] = value
+        self._refresh(i)
+        for j in self._neighbours(i):
+            self._refresh(j)
+
+    def carve(self, x, y):
+        self.set_cell(x, y, PATH)
+
+    def fill(self, x, y):
+        self.set_cell(x, y, WALL)
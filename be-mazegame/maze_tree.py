@@ -0,0 +1,245 @@
+from array import array
+
+from maze_grid import PATH
+from maze_gen import SLICE
+
+# 完美迷宫的路格构成一棵生成树（窗口化的无尽迷宫是森林）。
+# TreeIndex 每个迷宫只建一次：BFS 得到父节点和深度，再建倍增表，
+# 之后任意两格的 LCA / 距离查询都是 O(log n)，路径查询与路径长度成正比。
+# 倍增表占用 4 * 格子数 * log2(最大深度) 字节，适合常规关卡尺寸。
+
+
+class TreeIndex:
+    """生成树（森林）索引：父节点、深度、连通分量和倍增 LCA 表"""
+
+    def __init__(self, maze):
+        for _ in self._build(maze):
+            pass
+
+    @classmethod
+    def build_steps(cls, maze):
+        """分段建索引：每处理约 SLICE 个格子产出一次进度（0~1），结束时返回索引"""
+        index = cls.__new__(cls)
+        yield from index._build(maze)
+        return index
+
+    def _build(self, maze):
+        w = maze.width
+        size = len(maze.cells)
+        cells = maze.cells
+        self.width = w
+        # 倍增表按块计算，查表比 BFS 快得多，每块取 SLICE 的 16 倍
+        block = SLICE * 16
+        parent = array("i")
+        for start in range(0, size, block):
+            parent.extend(range(start, min(start + block, size)))
+            yield 0.0
+        depth = array("i", [-1]) * size
+        component = array("i", [-1]) * size
+        nodes = []
+        max_depth = 0
+        # BFS 约占建索引时间的 3/4，其余是倍增表
+        total = max(1, cells.count(PATH))
+        needle = bytes([PATH])
+        budget = SLICE
+        root = cells.find(needle)
+        while root != -1:
+            budget -= 1
+            if not budget:
+                budget = SLICE
+                yield 0.75 * len(nodes) / total
+            if depth[root] != -1:
+                root = cells.find(needle, root + 1)
+                continue
+            depth[root] = 0
+            component[root] = root
+            frontier = [root]
+            while frontier:
+                max_depth = max(max_depth, depth[frontier[0]])
+                nodes.extend(frontier)
+                nxt = []
+                for i in frontier:
+                    budget -= 1
+                    if not budget:
+                        budget = SLICE
+                        yield 0.75 * len(nodes) / total
+                    x = i % w
+                    for j in (i - 1 if x > 0 else -1, i + 1 if x < w - 1 else -1,
+                              i - w, i + w if i + w < size else -1):
+                        if j < 0 or cells[j] != PATH or j == parent[i]:
+                            continue
+                        if depth[j] != -1:
+                            raise ValueError("迷宫中存在环路，不是完美迷宫")
+                        parent[j] = i
+                        depth[j] = depth[i] + 1
+                        component[j] = root
+                        nxt.append(j)
+                frontier = nxt
+            root = cells.find(needle, root + 1)
+        self.depth = depth
+        self.component = component
+        self.nodes = nodes
+        self.max_depth = max_depth
+        # 倍增表：up[k][v] 是 v 的第 2^k 个祖先（根的祖先是自己）
+        self.up = [parent]
+        levels = max(1, self.max_depth.bit_length())
+        for k in range(1, levels):
+            prev = self.up[-1]
+            up = array("i")
+            for start in range(0, size, block):
+                up.extend([prev[p] for p in prev[start:start + block]])
+                yield 0.75 + 0.25 * (k - 1 + (start + block) / size) / levels
+            self.up.append(up)
+
+    def _index(self, cell):
+        i = cell[1] * self.width + cell[0]
+        if not 0 <= i < len(self.depth) or self.depth[i] == -1:
+            raise KeyError(f"{cell} 不是路格")
+        return i
+
+    def _pair(self, a, b):
+        """两格都是同一连通分量中的路格时返回它们的下标，否则返回 None"""
+        size, w = len(self.depth), self.width
+        i, j = a[1] * w + a[0], b[1] * w + b[0]
+        if not (0 <= i < size and 0 <= j < size):
+            return None
+        if self.depth[i] == -1 or self.component[i] != self.component[j]:
+            return None
+        return i, j
+
+    def _cell(self, i):
+        return i % self.width, i // self.width
+
+    def _ancestor(self, i, k):
+        bit = 0
+        while k:
+            if k & 1:
+                i = self.up[bit][i]
+            k >>= 1
+            bit += 1
+        return i
+
+    def _lca(self, a, b):
+        depth, up = self.depth, self.up
+        if depth[a] < depth[b]:
+            a, b = b, a
+        a = self._ancestor(a, depth[a] - depth[b])
+        if a == b:
+            return a
+        for k in range(len(up) - 1, -1, -1):
+            if up[k][a] != up[k][b]:
+                a, b = up[k][a], up[k][b]
+        return up[0][a]
+
+    def connected(self, a, b):
+        return self._pair(a, b) is not None
+
+    def depth_of(self, cell):
+        return self.depth[self._index(cell)]
+
+    def parent_of(self, cell):
+        """父节点坐标，根节点返回 None"""
+        i = self._index(cell)
+        p = self.up[0][i]
+        return None if p == i else self._cell(p)
+
+    def ancestor(self, cell, k):
+        """向根方向走 k 步后的格子，O(log k)"""
+        i = self._index(cell)
+        if k > self.depth[i]:
+            raise ValueError("超出根节点")
+        return self._cell(self._ancestor(i, k))
+
+    def lca(self, a, b):
+        """最近公共祖先，不连通或不是路格返回 None"""
+        pair = self._pair(a, b)
+        if pair is None:
+            return None
+        return self._cell(self._lca(*pair))
+
+    def distance(self, a, b):
+        """两格之间唯一路径的步数，不连通或不是路格返回 None，O(log n)"""
+        pair = self._pair(a, b)
+        if pair is None:
+            return None
+        a, b = pair
+        depth = self.depth
+        return depth[a] + depth[b] - 2 * depth[self._lca(a, b)]
+
+    def path(self, a, b):
+        """两格之间的唯一路径（含两端），不连通或不是路格返回 None"""
+        return _finish(self.path_steps(a, b))
+
+    def path_steps(self, a, b):
+        """分段版的 path：每走约 SLICE 格产出一次进度（0~1），结束时返回路径"""
+        pair = self._pair(a, b)
+        if pair is None:
+            return None
+        a, b = pair
+        top = self._lca(a, b)
+        parent, depth = self.up[0], self.depth
+        total = max(1, depth[a] + depth[b] - 2 * depth[top])
+        head = []
+        while a != top:
+            head.append(self._cell(a))
+            a = parent[a]
+            if not len(head) % SLICE:
+                yield len(head) / total
+        head.append(self._cell(top))
+        tail = []
+        while b != top:
+            tail.append(self._cell(b))
+            b = parent[b]
+            if not len(tail) % SLICE:
+                yield (len(head) + len(tail)) / total
+        tail.reverse()
+        return head + tail
+
+    def random_pair(self, rng, min_length=1, tries=256):
+        """随机挑选解路长度不小于 min_length 的一对格子
+
+        先随机抽样并用 O(log n) 的距离查询筛选；抽不到时取某格的第 min_length 个祖先，
+        若所有格子深度都不够，则返回最深的格子和它的根。
+        """
+        nodes, depth, component = self.nodes, self.depth, self.component
+        if len(nodes) < 2:
+            raise ValueError("路格数量不足")
+        min_length = max(1, min_length)
+        for _ in range(tries):
+            a, b = nodes[rng.randrange(len(nodes))], nodes[rng.randrange(len(nodes))]
+            if a != b and component[a] == component[b]:
+                if depth[a] + depth[b] - 2 * depth[self._lca(a, b)] >= min_length:
+                    return self._cell(a), self._cell(b)
+        deep = [i for i in nodes if depth[i] >= min_length]
+        if deep:
+            a = deep[rng.randrange(len(deep))]
+            return self._cell(a), self._cell(self._ancestor(a, min_length))
+        a = max(nodes, key=depth.__getitem__)
+        if depth[a] == 0:
+            raise ValueError("路格之间互不连通")
+        return self._cell(a), self._cell(component[a])
+
+
+def _finish(steps):
+    """一次跑完分段计算，返回它的结果"""
+    while True:
+        try:
+            next(steps)
+        except StopIteration as done:
+            return done.value
+
+
+def build_tree_index(maze):
+    """为完美迷宫建立树索引；迷宫有环路时返回 None"""
+    try:
+        return TreeIndex(maze)
+    except ValueError:
+        return None
+
+
+def build_tree_index_steps(maze):
+    """分段版的 build_tree_index：产出进度，结束时返回索引（有环路时为 None）"""
+    try:
+        return (yield from TreeIndex.build_steps(maze))
+    except ValueError:
+        return None
@@ -0,0 +1,121 @@
+from array import array
+
+import pygame
+
+from maze_grid import PATH
+from settings import WHITE, GRAY, RED, GREEN, YELLOW
+
+
+class Minimap:
+    """持久化小地图：底图每个点一个像素，新揭示的格子只画一次，显示时整体缩放后一次 blit
+
+    给定 max_size 时，迷宫按 block×block 格合成一个点，显示尺寸不超过 max_size，
+    一个点里揭示过路格就画成路，否则画成墙，有球就画球；大迷宫的小地图开销只与面板大小有关。
+    小球画在持久的透明图层上，只重画增删过小球的点；终点和玩家每帧直接画到屏幕上。
+    """
+
+    def __init__(self, maze, cell_px, max_size=None):
+        self.maze = maze
+        w, h = maze.width, maze.height
+        block = 1
+        if max_size is not None:
+            max_w, max_h = max_size
+            block = max(1, -(-w // max_w), -(-h // max_h))
+        # 小地图的点数，每个点显示为 cell_px×cell_px 像素
+        self.block = block
+        self.width, self.height = -(-w // block), -(-h // block)
+        if max_size is not None:
+            cell_px = max(1, min(cell_px, max_w // self.width, max_h // self.height))
+        self.cell_px = cell_px
+        self.size = (self.width * cell_px, self.height * cell_px)
+        self.base = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
+        self.painted = bytearray(w * h)
+        # 每个点已画的颜色：0 未揭示，1 墙，2 路（路优先）
+        self.shade = bytearray(self.width * self.height)
+        self.scaled = None
+        self.ball_layer = pygame.Surface(self.size, pygame.SRCALPHA)
+        # 小球层对应的 BallStore，换了对象（换关、滚动）时整体重画
+        self.balls = None
+        self.ball_cells = bytearray(w * h)
+        self.ball_counts = array("i", [0]) * (self.width * self.height)
+
+    def _point(self, x, y):
+        return (y // self.block) * self.width + x // self.block
+
+    def reveal(self, cells):
+        """把新记住的格子画到底图上，已画过的格子直接跳过"""
+        maze, painted, shade, base = self.maze, self.painted, self.shade, self.base
+        w, block = maze.width, self.block
+        for x, y in cells:
+            i = y*w + x
+            if not painted[i]:
+                painted[i] = 1
+                value = 2 if maze.cells[i] == PATH else 1
+                p = self._point(x, y)
+                if value > shade[p]:
+                    shade[p] = value
+                    base.set_at((x // block, y // block), WHITE if value == 2 else GRAY)
+                    self.scaled = None
+
+    def surface(self):
+        """缩放到显示尺寸的底图，只在有新格子时重新缩放"""
+        if self.scaled is None:
+            self.scaled = pygame.transform.scale(self.base, self.size)
+        return self.scaled
+
+    def _draw_point(self, p):
+        """重画小球层上的一个点：先擦掉，点里有球时再画"""
+        s = self.cell_px
+        x, y = p % self.width, p // self.width
+        rect = (x*s, y*s, s, s)
+        layer = self.ball_layer
+        layer.fill((0, 0, 0, 0), rect)
+        if self.ball_counts[p]:
+            radius = max(2, s//3)
+            if 2*radius + 1 > s:
+                # 点太小放不下圆，画成方块，免得压到相邻的点、擦除时留下残边
+                layer.fill(YELLOW, rect)
+            else:
+                pygame.draw.circle(layer, YELLOW, (x*s + s//2, y*s + s//2), radius)
+
+    def ball_surface(self, balls):
+        """小球层：只重画上次以来增删过小球的点"""
+        if balls is not self.balls:
+            self.balls = balls
+            balls.changes()
+            changed = None
+        else:
+            changed = balls.changes()
+        w = self.maze.width
+        marks, counts = self.ball_cells, self.ball_counts
+        if changed is None:
+            marks[:] = bytes(len(marks))
+            counts[:] = array("i", [0]) * len(counts)
+            for x, y in zip(balls.xs, balls.ys):
+                marks[y*w + x] = 1
+                counts[self._point(x, y)] += 1
+            self.ball_layer.fill((0, 0, 0, 0))
+            for p, count in enumerate(counts):
+                if count:
+                    self._draw_point(p)
+        else:
+            for x, y in changed:
+                i = y*w + x
+                present = (x, y) in balls
+                if present != marks[i]:
+                    marks[i] = present
+                    p = self._point(x, y)
+                    counts[p] += 1 if present else -1
+                    self._draw_point(p)
+        return self.ball_layer
+
+    def draw(self, surface, pos, end, player_pos, balls):
+        """把小地图画到 surface 的 pos 处：底图、终点、玩家和小球"""
+        ox, oy = pos
+        s, block = self.cell_px, self.block
+        surface.blit(self.surface(), pos)
+        surface.fill(RED, (ox + end[0] // block * s, oy + end[1] // block * s, s, s))
+        px, py = player_pos[0] // block, player_pos[1] // block
+        size = max(2, int(s - 2))
+        surface.fill(GREEN, (ox + px*s + (s - size)//2, oy + py*s + (s - size)//2, size, size))
+        surface.blit(self.ball_surface(balls), pos)
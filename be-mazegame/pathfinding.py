@@ -0,0 +1,131 @@
+import heapq
+
+from maze_grid import PATH
+
+# 迷宫寻路：所有搜索都在一维下标上进行，用父指针字典回溯路径，
+# 不再为每个入队节点复制整条路径；内存只与搜索到的格子数成正比。
+
+
+def _neighbours(i, w, size, cells):
+    """四邻域中可通行的格子下标"""
+    x = i % w
+    result = []
+    if x > 0 and cells[i - 1] == PATH:
+        result.append(i - 1)
+    if x < w - 1 and cells[i + 1] == PATH:
+        result.append(i + 1)
+    if i >= w and cells[i - w] == PATH:
+        result.append(i - w)
+    if i + w < size and cells[i + w] == PATH:
+        result.append(i + w)
+    return result
+
+
+def _trace(parent, i, w):
+    """沿父指针回溯，返回从根到 i 的坐标列表"""
+    path = []
+    while i != -1:
+        path.append((i % w, i // w))
+        i = parent[i]
+    path.reverse()
+    return path
+
+
+def _endpoints(maze, start, end):
+    if not (maze.is_path(*start) and maze.is_path(*end)):
+        return None
+    return maze.index(*start), maze.index(*end)
+
+
+def bfs_path(maze, start, end):
+    """广度优先搜索，返回最短路径（含起点终点），不可达返回 None"""
+    ends = _endpoints(maze, start, end)
+    if ends is None:
+        return None
+    s, t = ends
+    w, size, cells = maze.width, len(maze.cells), maze.cells
+    parent = {s: -1}
+    frontier = [s]
+    while frontier:
+        nxt = []
+        for i in frontier:
+            if i == t:
+                return _trace(parent, t, w)
+            for j in _neighbours(i, w, size, cells):
+                if j not in parent:
+                    parent[j] = i
+                    nxt.append(j)
+        frontier = nxt
+    return None
+
+
+def bidirectional_path(maze, start, end):
+    """双向广度优先搜索：每次扩展较小的一侧，两侧相遇即得最短路径"""
+    ends = _endpoints(maze, start, end)
+    if ends is None:
+        return None
+    s, t = ends
+    w, size, cells = maze.width, len(maze.cells), maze.cells
+    if s == t:
+        return [start]
+    fwd, bwd = {s: -1}, {t: -1}
+    fwd_frontier, bwd_frontier = [s], [t]
+    while fwd_frontier and bwd_frontier:
+        forward = len(fwd_frontier) <= len(bwd_frontier)
+        frontier = fwd_frontier if forward else bwd_frontier
+        mine, other = (fwd, bwd) if forward else (bwd, fwd)
+        nxt = []
+        for i in frontier:
+            for j in _neighbours(i, w, size, cells):
+                if j in mine:
+                    continue
+                mine[j] = i
+                if j in other:
+                    head = _trace(fwd, j, w)
+                    tail = _trace(bwd, j, w)
+                    tail.reverse()
+                    return head + tail[1:]
+                nxt.append(j)
+        if forward:
+            fwd_frontier = nxt
+        else:
+            bwd_frontier = nxt
+    return None
+
+
+def astar_path(maze, start, end):
+    """A* 搜索，曼哈顿距离作启发函数"""
+    ends = _endpoints(maze, start, end)
+    if ends is None:
+        return None
+    s, t = ends
+    w, size, cells = maze.width, len(maze.cells), maze.cells
+    tx, ty = end
+    parent = {s: -1}
+    cost = {s: 0}
+    heap = [(abs(start[0] - tx) + abs(start[1] - ty), 0, s)]
+    while heap:
+        _, g, i = heapq.heappop(heap)
+        if i == t:
+            return _trace(parent, t, w)
+        if g > cost[i]:
+            continue
+        g += 1
+        for j in _neighbours(i, w, size, cells):
+            if g < cost.get(j, g + 1):
+                cost[j] = g
+                parent[j] = i
+                heapq.heappush(heap, (g + abs(j % w - tx) + abs(j // w - ty), g, j))
+    return None
+
+
+SEARCHES = {
+    "bfs": bfs_path,
+    "bidirectional": bidirectional_path,
+    "astar": astar_path,
+}
+
+
+def find_path(maze, start, end, method="bidirectional"):
+    """在任意尺寸的迷宫上寻找最短路径，返回坐标列表或 None"""
+    return SEARCHES[method](maze, start, end)
@@ -0,0 +1,146 @@
+"""逐帧分段计时：主循环各阶段用命名的计时段包起来，统计帧时间分布，可导出 Chrome trace
+
+    from profiler import profiler
+    with profiler.scope("draw"):
+        ...
+    profiler.frame()  # 每帧末尾调用一次
+
+关闭时 scope 返回共享的空计时段，只多一次方法调用；开启后每段记下起止时间，
+最近 history 帧的帧时间和各阶段耗时用于计算 p50/p95/p99，最近 trace_limit 个计时段可导出为
+Chrome trace（chrome://tracing 或 Perfetto 打开）。计时段不可重入，同名计时段不能嵌套。
+"""
+import json
+import time
+from collections import deque
+
+from settings import PROFILE_ENABLED, PROFILE_HISTORY, PROFILE_TRACE_EVENTS
+
+
+class _NullScope:
+    """关闭时使用的空计时段"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL = _NullScope()
+
+
+class _Scope:
+    """一个命名计时段，按名字缓存复用"""
+
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = self.profiler.clock()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, self.start, self.profiler.clock() - self.start)
+        return False
+
+
+class Profiler:
+    """按帧统计各计时段的耗时"""
+
+    def __init__(self, enabled=PROFILE_ENABLED, history=PROFILE_HISTORY, trace_limit=PROFILE_TRACE_EVENTS,
+                 clock=time.perf_counter):
+        self.enabled = enabled
+        self.clock = clock
+        self.origin = clock()
+        self.scopes = {}
+        # 最近 history 帧：(帧时间秒, {阶段名: 本帧累计秒})
+        self.frames = deque(maxlen=history)
+        # 最近 trace_limit 个计时段：(名字, 开始秒, 时长秒)
+        self.trace = deque(maxlen=trace_limit)
+        self.current = {}
+        self.frame_start = None
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+        # 开关之间的那一帧不完整，不计入
+        self.frame_start = None
+        self.current = {}
+
+    def scope(self, name):
+        """计时段，配合 with 使用；关闭时什么也不做"""
+        if not self.enabled:
+            return _NULL
+        scope = self.scopes.get(name)
+        if scope is None:
+            scope = self.scopes[name] = _Scope(self, name)
+        return scope
+
+    def add(self, name, start, duration):
+        """记下一个计时段（也可用于在别处计好的时间）"""
+        current = self.current
+        current[name] = current.get(name, 0.0) + duration
+        self.trace.append((name, start, duration))
+
+    def frame(self):
+        """标记一帧结束：记下帧时间和本帧各阶段的耗时"""
+        if not self.enabled:
+            return
+        now = self.clock()
+        if self.frame_start is not None:
+            duration = now - self.frame_start
+            self.frames.append((duration, self.current))
+            self.trace.append(("frame", self.frame_start, duration))
+        self.current = {}
+        self.frame_start = now
+
+    def percentiles(self, points=(50, 95, 99)):
+        """最近各帧帧时间（毫秒）的分位数，没有数据时为 None"""
+        if not self.frames:
+            return None
+        ordered = sorted(duration for duration, _ in self.frames)
+        n = len(ordered)
+        return tuple(ordered[min(n - 1, n * p // 100)] * 1000 for p in points)
+
+    def phases(self):
+        """最近各帧中各阶段的平均耗时（毫秒），按耗时从大到小排列"""
+        n = len(self.frames)
+        totals = {}
+        for _, phases in self.frames:
+            for name, duration in phases.items():
+                totals[name] = totals.get(name, 0.0) + duration
+        return sorted(((name, total / n * 1000) for name, total in totals.items()), key=lambda item: -item[1])
+
+    def chrome_trace(self):
+        """Chrome trace 格式（完整事件，时间单位微秒）"""
+        origin = self.origin
+        events = [{"name": name, "ph": "X", "ts": round((start - origin) * 1e6, 1),
+                   "dur": round(duration * 1e6, 1), "pid": 1, "tid": 1}
+                  for name, start, duration in self.trace]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export(self, path):
+        """把最近的计时段写成 Chrome trace 文件，返回事件数"""
+        trace = self.chrome_trace()
+        with open(path, "w") as f:
+            json.dump(trace, f)
+        return len(trace["traceEvents"])
+
+    def report(self):
+        """文字摘要：帧时间分位数和各阶段平均耗时"""
+        stats = self.percentiles()
+        if stats is None:
+            return "没有帧数据"
+        lines = [f"{len(self.frames)} 帧，帧时间 p50 {stats[0]:.2f}ms  p95 {stats[1]:.2f}ms  p99 {stats[2]:.2f}ms"]
+        for name, ms in self.phases():
+            lines.append(f"  {name:<12}{ms:8.3f}ms")
+        return "\n".join(lines)
+
+
+# 全局计时器，游戏前端和 GameState 共用
+profiler = Profiler()
@@ -0,0 +1,237 @@
+from collections import OrderedDict
+
+import pygame
+
+from maze_grid import PATH
+from camera import Camera
+from settings import (
+    CELL_SIZE, PLAYER_SIZE, CHUNK_SIZE, CHUNK_CACHE_BYTES, WHITE, BLACK, GRAY, DARK, RED, BLUE,
+)
+from text_cache import ball_sprite
+
+# 格子动态内容标志位
+VISIBLE = 1
+GOAL = 2
+HINT = 4
+PLAYER = 8
+GHOST = 16
+BALL_SHIFT = 5  # 小球数字存放在第 5 位及以上
+
+
+class ChunkCache:
+    """静态迷宫层的分块缓存：每块 CHUNK_SIZE×CHUNK_SIZE 格，用到时才烘焙
+
+    超过内存上限 budget（字节）时淘汰最久未用的块，大迷宫只有视口附近的块常驻。
+    """
+
+    def __init__(self, budget=CHUNK_CACHE_BYTES):
+        self.budget = budget
+        self.chunks = OrderedDict()
+        self.bytes = 0
+        self.baked = 0
+        self.evicted = 0
+
+    def clear(self):
+        self.chunks.clear()
+        self.bytes = 0
+
+    def get(self, game, cx, cy):
+        """第 (cx, cy) 块的表面，没有缓存时当场烘焙"""
+        key = (cx, cy)
+        surface = self.chunks.get(key)
+        if surface is not None:
+            self.chunks.move_to_end(key)
+            return surface
+        surface = self.bake(game, cx, cy)
+        self.chunks[key] = surface
+        self.bytes += self._size(surface)
+        self.baked += 1
+        # 至少保留刚烘焙的这一块
+        while self.bytes > self.budget and len(self.chunks) > 1:
+            _, old = self.chunks.popitem(last=False)
+            self.bytes -= self._size(old)
+            self.evicted += 1
+        return surface
+
+    def _size(self, surface):
+        return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+    def bake(self, game, cx, cy):
+        """把一块不随时间变化的迷宫画到表面上"""
+        maze = game.state.maze
+        x0, y0 = cx*CHUNK_SIZE, cy*CHUNK_SIZE
+        x1, y1 = min(x0 + CHUNK_SIZE, maze.width), min(y0 + CHUNK_SIZE, maze.height)
+        surface = pygame.Surface(((x1 - x0)*CELL_SIZE, (y1 - y0)*CELL_SIZE))
+        surface.fill(BLACK)
+        texture = game.background_texture
+        if texture:
+            # 背景材质按整个迷宫平铺，各块从自己在迷宫中的位置接上
+            tw, th = texture.get_size()
+            for y in range(-(y0*CELL_SIZE % th), surface.get_height(), th):
+                for x in range(-(x0*CELL_SIZE % tw), surface.get_width(), tw):
+                    surface.blit(texture, (x, y))
+        for y in range(y0, y1):
+            row = maze.row(y)
+            for x in range(x0, x1):
+                rect = ((x - x0)*CELL_SIZE, (y - y0)*CELL_SIZE, CELL_SIZE, CELL_SIZE)
+                if row[x] == PATH:
+                    if game.path_texture:
+                        surface.blit(game.path_texture, rect)
+                    else:
+                        pygame.draw.rect(surface, WHITE, rect)
+                else:
+                    if game.wall_texture:
+                        surface.blit(game.wall_texture, rect)
+                    else:
+                        pygame.draw.rect(surface, GRAY, rect)
+        return surface
+
+
+class MazeRenderer:
+    """迷宫区域渲染器：通过镜头显示迷宫的一部分，静态迷宫层分块缓存，每帧只重绘发生变化的格子
+
+    每帧为视口内带有动态内容的格子（视野、终点、提示、小球、玩家）生成标志位字典，
+    与上一帧比较得到脏格子；render 返回脏矩形列表，整屏重绘（包括镜头移动）时返回 None。
+    绘制开销只与视口大小有关，与迷宫大小无关。
+    """
+
+    def __init__(self, screen, view=None, camera=None):
+        self.screen = screen
+        self.camera = camera or Camera()
+        # 迷宫区域在屏幕上的矩形
+        self.view = pygame.Rect(view or (0, 0, self.camera.width*CELL_SIZE, self.camera.height*CELL_SIZE))
+        self.chunks = ChunkCache()
+        self.last = None
+        self.fog_on = None
+        self.recenter = True
+
+    def invalidate(self):
+        """迷宫或材质变化后调用，丢弃分块缓存，镜头重新对准玩家并整屏重绘"""
+        self.chunks.clear()
+        self.last = None
+        self.recenter = True
+
+    def to_screen(self, x, y):
+        """迷宫格子 (x, y) 左上角的屏幕坐标"""
+        return (self.view.x + (x - self.camera.x)*CELL_SIZE,
+                self.view.y + (y - self.camera.y)*CELL_SIZE)
+
+    def frame_state(self, game, vision):
+        """本帧视口内所有带动态内容的格子及其标志位"""
+        world = game.state
+        fog = world.fog_on
+        x0, y0, x1, y1 = self.camera.bounds()
+        state = dict.fromkeys(vision.cells(), VISIBLE) if fog else {}
+        if not fog or vision.is_visible(*world.end):
+            state[world.end] = state.get(world.end, 0) | GOAL
+        if world.show_hint:
+            for cell in world.hint_path[1:-1]:
+                state[cell] = state.get(cell, 0) | HINT
+        if fog:
+            px, py = world.player.get_pos()
+            r = vision.radius
+            shown = world.balls.in_rect(max(px-r, x0), max(py-r, y0), min(px+r, x1), min(py+r, y1))
+        else:
+            shown = world.balls.in_rect(x0, y0, x1, y1)
+        for cell, num in shown:
+            if not fog or vision.is_visible(*cell):
+                state[cell] = state.get(cell, 0) | (num << BALL_SHIFT)
+        pos = world.player.get_pos()
+        state[pos] = state.get(pos, 0) | PLAYER | (GHOST if world.player.ghost_mode else 0)
+        return {cell: flags for cell, flags in state.items()
+                if x0 <= cell[0] <= x1 and y0 <= cell[1] <= y1}
+
+    def draw_cell(self, game, cell, flags):
+        """重绘一个格子：底图（迷宫或迷雾）加上格子上的动态内容"""
+        screen = self.screen
+        x, y = cell
+        rect = pygame.Rect(self.to_screen(x, y), (CELL_SIZE, CELL_SIZE))
+        if game.state.fog_on and not flags & VISIBLE:
+            screen.fill(DARK, rect)
+        else:
+            chunk = self.chunks.get(game, x // CHUNK_SIZE, y // CHUNK_SIZE)
+            screen.blit(chunk, rect, ((x % CHUNK_SIZE)*CELL_SIZE, (y % CHUNK_SIZE)*CELL_SIZE,
+                                      CELL_SIZE, CELL_SIZE))
+
+        if flags & GOAL:
+            if game.goal_texture:
+                screen.blit(game.goal_texture, rect.topleft)
+            else:
+                pygame.draw.rect(screen, RED, rect)
+
+        if flags & HINT:
+            pygame.draw.circle(screen, BLUE, rect.center, CELL_SIZE//8)
+
+        num = flags >> BALL_SHIFT
+        if num:
+            # 预渲染的带数字小球贴图
+            screen.blit(ball_sprite(num, game.ball_texture), rect.topleft)
+
+        if flags & PLAYER:
+            offset = (CELL_SIZE - PLAYER_SIZE) // 2
+            game.state.player.draw(screen, rect.x + offset, rect.y + offset)
+        return rect
+
+    def redraw_area(self, game, area):
+        """按上一帧的状态重绘视口中与 area 相交的部分，返回需要推送的矩形"""
+        area = area.clip(self.view)
+        if not area:
+            return []
+        # 视口里迷宫以外的部分是黑底
+        self.screen.fill(BLACK, area)
+        rects = [area]
+        cam = self.camera
+        x0, y0, x1, y1 = cam.bounds()
+        left = max(cam.x + (area.left - self.view.x) // CELL_SIZE, x0)
+        top = max(cam.y + (area.top - self.view.y) // CELL_SIZE, y0)
+        right = min(cam.x + (area.right - 1 - self.view.x) // CELL_SIZE, x1)
+        bottom = min(cam.y + (area.bottom - 1 - self.view.y) // CELL_SIZE, y1)
+        for y in range(top, bottom + 1):
+            for x in range(left, right + 1):
+                rects.append(self.draw_cell(game, (x, y), self.last.get((x, y), 0)))
+        return rects
+
+    def draw_view(self, game, state):
+        """整屏重绘视口：迷雾下先铺满迷雾，否则贴上视口内的各块，再画动态内容"""
+        screen, cam = self.screen, self.camera
+        x0, y0, x1, y1 = cam.bounds()
+        screen.set_clip(self.view)
+        screen.fill(BLACK)
+        maze_rect = pygame.Rect(self.to_screen(x0, y0), ((x1 - x0 + 1)*CELL_SIZE, (y1 - y0 + 1)*CELL_SIZE))
+        if game.state.fog_on:
+            screen.fill(DARK, maze_rect)
+        else:
+            for cy in range(y0 // CHUNK_SIZE, y1 // CHUNK_SIZE + 1):
+                for cx in range(x0 // CHUNK_SIZE, x1 // CHUNK_SIZE + 1):
+                    chunk = self.chunks.get(game, cx, cy)
+                    screen.blit(chunk, self.to_screen(cx*CHUNK_SIZE, cy*CHUNK_SIZE))
+        screen.set_clip(None)
+        for cell, flags in state.items():
+            self.draw_cell(game, cell, flags)
+
+    def render(self, game, vision):
+        """绘制迷宫区域，返回需要推送到屏幕的脏矩形；需要整屏刷新时返回 None"""
+        world = game.state
+        px, py = world.player.get_pos()
+        if self.recenter:
+            self.camera.center(px, py, world.maze)
+            self.recenter = False
+        elif self.camera.follow(px, py, world.maze):
+            self.last = None
+        state = self.frame_state(game, vision)
+        fog_on = world.fog_on
+        if self.last is None or self.fog_on != fog_on:
+            self.draw_view(game, state)
+            self.last = state
+            self.fog_on = fog_on
+            return None
+
+        last = self.last
+        rects = []
+        for cell, flags in state.items():
+            if last.get(cell) != flags:
+                rects.append(self.draw_cell(game, cell, flags))
+        for cell in last.keys() - state.keys():
+            rects.append(self.draw_cell(game, cell, 0))
+        self.last = state
+        return rects
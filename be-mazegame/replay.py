@@ -0,0 +1,266 @@
+"""录制与回放：按步记录输入和时间增量，回放时在无界面的 GameState 上原样重跑一局
+
+文件格式（整数都是无符号变长编码 varint）：
+    头部  b"MZRP"、版本号（1 字节）、种子、标志位（bit0 无尽模式，bit1 迷宫库）、RULE_FIELDS 中各规则参数；
+          有迷宫库时接着是路径字节数、UTF-8 路径和 32 字节的内容摘要（SHA-256），回放时按路径重新打开并校验
+    记录  标志字节：低 3 位为方向编号，bit3 表示带操作，bit4 表示重复
+          接着是 dt；有重复时是连续相同（dt、方向、无操作）的步数；带操作时是操作个数和各操作编号
+    结尾  0xFF，然后是终局摘要（SUMMARY_FIELDS），回放时用来校验是否完全一致
+
+用法：
+    python replay.py session.mzr            # 无界面全速回放并校验
+    python replay.py session.mzr --slowest 10
+"""
+import argparse
+import os
+import sys
+import time
+
+from game_state import (
+    GameState, Rules, Inputs, UP, DOWN, LEFT, RIGHT,
+    SHIFT, LEVEL_UP, LEVEL_DOWN, TOGGLE_FOG, TOGGLE_GHOST, COLLECT_ALL, TOGGLE_HINT, QUIT,
+)
+from maze_stream import endless_source
+from level_catalog import LevelCatalog
+
+MAGIC = b"MZRP"
+VERSION = 3
+READ_VERSIONS = (2, VERSION)  # 版本 2 没有迷宫库字段，其余格式相同
+ENDLESS = 1
+STORE = 2
+DIGEST_SIZE = 32
+END_TAG = 0xFF
+ACTIONS_BIT = 0x08
+REPEAT_BIT = 0x10
+
+MOVES = (None, UP, DOWN, LEFT, RIGHT)
+MOVE_CODES = {move: code for code, move in enumerate(MOVES)}
+ACTIONS = (SHIFT, LEVEL_UP, LEVEL_DOWN, TOGGLE_FOG, TOGGLE_GHOST, COLLECT_ALL, TOGGLE_HINT, QUIT)
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+RULE_FIELDS = ("width", "height", "min_path_length", "vision_radius", "shadowcast", "move_cooldown",
+               "pickup_refresh_interval", "challenge_time", "challenge_presses")
+SUMMARY_FIELDS = ("steps", "time", "level", "x", "y", "collected", "balls", "running")
+
+
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, pos):
+    """从 pos 读一个 varint，返回 (值, 新位置)"""
+    value = shift = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        value |= (b & 0x7F) << shift
+        if b < 0x80:
+            return value, pos
+        shift += 7
+
+
+def summarize(state, steps):
+    """终局摘要，录制和回放各算一次，相同则说明回放完全一致"""
+    x, y = state.player.get_pos()
+    return (steps, state.time, state.level, x, y, len(state.player.collected), len(state.balls),
+            int(state.running))
+
+
+class Recorder:
+    """逐步录制输入；相邻的相同步（dt、方向相同且没有操作）合并成一条重复记录"""
+
+    def __init__(self, seed, rules, endless=False, store=None):
+        """store 为本局取关卡用的 MazeStore，录像中记下它的路径和内容摘要"""
+        self.data = bytearray(MAGIC)
+        self.data.append(VERSION)
+        write_varint(self.data, seed)
+        write_varint(self.data, (ENDLESS if endless else 0) | (STORE if store is not None else 0))
+        for name in RULE_FIELDS:
+            write_varint(self.data, int(getattr(rules, name)))
+        if store is not None:
+            path = os.path.abspath(store.path).encode("utf-8")
+            write_varint(self.data, len(path))
+            self.data += path
+            self.data += store.digest()
+        self.steps = 0
+        # 尚未写出的重复段：(dt, 方向编号, 步数)
+        self.run = None
+
+    def record(self, inputs, dt):
+        self.steps += 1
+        move = MOVE_CODES[inputs.move]
+        if not inputs.actions:
+            if self.run and self.run[0] == dt and self.run[1] == move:
+                self.run[2] += 1
+                return
+            self._flush()
+            self.run = [dt, move, 1]
+            return
+        self._flush()
+        self.data.append(move | ACTIONS_BIT)
+        write_varint(self.data, dt)
+        write_varint(self.data, len(inputs.actions))
+        for action in inputs.actions:
+            self.data.append(ACTION_CODES[action])
+
+    def _flush(self):
+        if self.run is None:
+            return
+        dt, move, count = self.run
+        self.run = None
+        if count == 1:
+            self.data.append(move)
+            write_varint(self.data, dt)
+        else:
+            self.data.append(move | REPEAT_BIT)
+            write_varint(self.data, dt)
+            write_varint(self.data, count)
+
+    def finish(self, state):
+        """写入结尾和终局摘要，返回完整的录像字节"""
+        self._flush()
+        self.data.append(END_TAG)
+        for value in summarize(state, self.steps):
+            write_varint(self.data, value)
+        return bytes(self.data)
+
+    def save(self, path, state):
+        data = self.finish(state)
+        with open(path, "wb") as f:
+            f.write(data)
+        return len(data)
+
+
+class Recording:
+    """解析后的录像：种子、规则、是否无尽模式、迷宫库，以及逐步的 (inputs, dt)"""
+
+    def __init__(self, data):
+        if data[:4] != MAGIC:
+            raise ValueError("不是迷宫录像文件")
+        if data[4] not in READ_VERSIONS:
+            raise ValueError(f"不支持的录像版本: {data[4]}")
+        self.data = data
+        pos = 5
+        self.seed, pos = read_varint(data, pos)
+        flags, pos = read_varint(data, pos)
+        self.endless = bool(flags & ENDLESS)
+        values = {}
+        for name in RULE_FIELDS:
+            values[name], pos = read_varint(data, pos)
+        values["shadowcast"] = bool(values["shadowcast"])
+        self.rules = Rules(**values)
+        # 迷宫库的路径和内容摘要，不用迷宫库的录像为 None
+        self.store_path = self.store_digest = None
+        if flags & STORE:
+            n, pos = read_varint(data, pos)
+            self.store_path = bytes(data[pos:pos + n]).decode("utf-8")
+            pos += n
+            self.store_digest = bytes(data[pos:pos + DIGEST_SIZE])
+            pos += DIGEST_SIZE
+        self.body = pos
+        self.summary = None
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls(f.read())
+
+    def steps(self):
+        """逐步产出 (inputs, dt)，读到结尾时记下录制时的终局摘要"""
+        data, pos = self.data, self.body
+        idle = {}
+        while pos < len(data):
+            tag = data[pos]
+            pos += 1
+            if tag == END_TAG:
+                summary = []
+                for _ in SUMMARY_FIELDS:
+                    value, pos = read_varint(data, pos)
+                    summary.append(value)
+                self.summary = tuple(summary)
+                return
+            move = MOVES[tag & 0x07]
+            dt, pos = read_varint(data, pos)
+            if tag & ACTIONS_BIT:
+                n, pos = read_varint(data, pos)
+                actions = [ACTIONS[code] for code in data[pos:pos + n]]
+                pos += n
+                yield Inputs(move, actions), dt
+                continue
+            count = 1
+            if tag & REPEAT_BIT:
+                count, pos = read_varint(data, pos)
+            inputs = idle.get(move)
+            if inputs is None:
+                inputs = idle[move] = Inputs(move)
+            for _ in range(count):
+                yield inputs, dt
+
+    def new_state(self, log=None):
+        """按录像的种子和规则新建一局；用迷宫库录制的录像重新打开同一个迷宫库"""
+        source = None
+        if self.endless:
+            source = endless_source(self.rules.width, self.rules.height, seed=self.seed)
+        elif self.store_path is not None:
+            source = LevelCatalog.open(self.store_path)
+            if source.store.digest() != self.store_digest:
+                source.close()
+                raise ValueError(f"迷宫库 {self.store_path} 的内容与录制时不同，无法回放")
+        return GameState(source, log=log, rules=self.rules, seed=self.seed)
+
+
+def replay(recording, log=None, timings=None):
+    """无界面全速回放；timings 为列表时追加每步的 (模拟时间, 耗时秒)。返回 (state, 终局摘要)"""
+    state = recording.new_state(log)
+    steps = 0
+    clock = time.perf_counter
+    for inputs, dt in recording.steps():
+        if timings is None:
+            state.step(inputs, dt)
+        else:
+            t = clock()
+            state.step(inputs, dt)
+            timings.append((state.time, clock() - t))
+        steps += 1
+    return state, summarize(state, steps)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="无界面回放迷宫录像")
+    parser.add_argument("path")
+    parser.add_argument("--slowest", type=int, default=5, help="列出最慢的若干步")
+    parser.add_argument("--log", action="store_true", help="打印游戏内的提示信息")
+    args = parser.parse_args(argv)
+
+    recording = Recording.load(args.path)
+    timings = []
+    started = time.perf_counter()
+    state, summary = replay(recording, print if args.log else None, timings)
+    elapsed = time.perf_counter() - started
+
+    mode = "无尽模式" if recording.endless else "普通模式"
+    if recording.store_path is not None:
+        mode += f"，迷宫库 {recording.store_path}"
+    print(f"种子 {recording.seed}，{mode}，{len(recording.data)} 字节")
+    print(f"{summary[0]} 步，模拟 {state.time / 1000:.1f}s，回放用时 {elapsed:.2f}s"
+          f"（{state.time / 1000 / max(elapsed, 1e-9):.0f} 倍速）")
+    if recording.summary is None:
+        print("录像没有结尾摘要（可能未正常结束），无法校验")
+    elif recording.summary == summary:
+        print("回放与录制完全一致")
+    else:
+        print("回放与录制不一致:")
+        for name, a, b in zip(SUMMARY_FIELDS, recording.summary, summary):
+            if a != b:
+                print(f"  {name}: 录制 {a}，回放 {b}")
+    if args.slowest:
+        print("最慢的步（模拟时间 ms，耗时 ms）:")
+        for t, cost in sorted(timings, key=lambda item: -item[1])[:args.slowest]:
+            print(f"  {t:>10} {cost * 1000:8.2f}")
+    return 0 if recording.summary in (None, summary) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
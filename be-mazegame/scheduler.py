@@ -0,0 +1,56 @@
+import time
+
+from settings import LOGIC_STEP, MAX_LOGIC_STEPS
+
+
+class FixedStep:
+    """固定步长调度：累积真实经过的时间，按 step 毫秒切成整数个逻辑步
+
+    绘制慢时一帧会补跑多个逻辑步（跳过中间的绘制），逻辑时间不受绘制影响；
+    但每帧最多补 max_steps 步，卡顿过久时丢弃多出的时间，避免越补越慢。
+    """
+
+    def __init__(self, step=LOGIC_STEP, max_steps=MAX_LOGIC_STEPS):
+        self.step = step
+        self.max_steps = max_steps
+        self.accumulator = 0
+        # 统计：累计跑过的逻辑步、补跑（一帧多于一步）的帧数、因积压丢弃的时间
+        self.ticks = 0
+        self.catch_up_frames = 0
+        self.dropped = 0
+
+    def advance(self, elapsed):
+        """加入经过的 elapsed 毫秒，返回本帧应跑的逻辑步数"""
+        self.accumulator += elapsed
+        steps = self.accumulator // self.step
+        if steps > self.max_steps:
+            self.dropped += (steps - self.max_steps) * self.step
+            steps = self.max_steps
+            self.accumulator %= self.step
+        else:
+            self.accumulator -= steps * self.step
+        if steps > 1:
+            self.catch_up_frames += 1
+        self.ticks += steps
+        return int(steps)
+
+    @property
+    def alpha(self):
+        """距下一个逻辑步的进度（0~1），可用于插值绘制"""
+        return self.accumulator / self.step
+
+    def reset(self):
+        self.accumulator = 0
+
+
+def run_sliced(steps, budget, clock=time.perf_counter):
+    """推进可恢复的迭代器 steps，直到耗尽或用完 budget 毫秒；返回 (是否已完成, 最后产出的值)
+
+    每产出一次检查一次时间，所以单段工作量要远小于 budget。
+    """
+    deadline = clock() + budget / 1000
+    value = None
+    for value in steps:
+        if clock() >= deadline:
+            return False, value
+    return True, value
@@ -0,0 +1,66 @@
+# 迷宫参数
+CELL_SIZE = 30  # 增大格子尺寸
+MAZE_WIDTH = 40  # 增加迷宫宽度
+MAZE_HEIGHT = 27  # 增加迷宫高度
+VIEW_WIDTH = 40  # 视口宽度（格），窗口按视口大小而不是迷宫大小创建
+VIEW_HEIGHT = 27  # 视口高度（格），迷宫比视口大时镜头跟随玩家滚动
+CAMERA_MARGIN = 6  # 玩家离视口边缘少于这么多格时镜头才移动
+CHUNK_SIZE = 16  # 静态迷宫层按 CHUNK_SIZE×CHUNK_SIZE 格分块缓存
+CHUNK_CACHE_BYTES = 32 * 1024 * 1024  # 分块缓存的内存上限，超过后淘汰最久未用的块
+PATH_WIDTH = 2  # 扩宽迷宫道路
+MIN_PATH_LENGTH = 0  # 起点到终点的最短解路步数，0 表示不限制
+ENDLESS_SCROLL_MARGIN = 9  # 无尽模式：玩家距窗口底部少于该行数时向下滚动
+
+# 玩家尺寸 - 恢复原来的尺寸
+PLAYER_SIZE = CELL_SIZE - 8  # 恢复为原来的尺寸
+
+# 游戏规则（时间单位：毫秒）
+MOVE_COOLDOWN = 100  # 按住方向键时两次移动的最小间隔
+BALL_PICKUP_REFRESH_INTERVAL = 500  # 首次完成后，拾取小球到补充新球的间隔
+SHIFT_CHALLENGE_TIME = 3000  # 死角挑战的限时
+SHIFT_CHALLENGE_PRESSES = 5  # 死角挑战需要按 Shift 的次数
+
+# 主循环：逻辑按固定步长推进，与绘制帧率无关
+LOGIC_STEP = 10  # 每个逻辑步的时长（毫秒）
+MAX_LOGIC_STEPS = 10  # 每帧最多补跑的逻辑步数，积压更多时丢弃多出的时间
+RENDER_FPS = 60  # 绘制帧率上限，0 表示不限制
+
+# 性能分析：主循环各阶段计时，F3 显示/隐藏性能面板，F4 导出 Chrome trace
+PROFILE_ENABLED = False  # 启动时是否开启计时（关闭时计时段几乎没有开销）
+PROFILE_HISTORY = 600  # 统计帧时间分位数用的最近帧数
+PROFILE_TRACE_EVENTS = 200000  # 保留的最近计时段个数，导出 trace 时写出
+PROFILE_TRACE_PATH = "trace.json"  # F4 导出的文件
+PROFILE_OVERLAY_INTERVAL = 250  # 性能面板的刷新间隔（毫秒）
+
+# 关卡预建：玩当前关时预先建好下一关
+LEVEL_PREFETCH = "slice"  # "slice" 主线程分帧建，"thread" 后台线程建，"sync" 换关时当场建
+LEVEL_BUILD_BUDGET = 4  # 分帧建关时每帧最多占用的时间（毫秒）
+LOADING_FRAME_BUDGET = 30  # 等待建关时，两帧加载动画之间建关的时间（毫秒）
+
+# 关卡目录：按关卡号从迷宫库中取难度相当的迷宫（难度按分位数划分）
+CATALOG_BAND = 0.2  # 每关可选的难度带宽度，例如 0.2 表示全部关卡中的 20%
+CATALOG_LEVEL_STEP = 0.1  # 每升一关，难度带上移的分位数
+
+# 颜色
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+GREEN = (0, 255, 0)
+RED = (255, 0, 0)
+GRAY = (180, 180, 180)
+BLUE = (0, 0, 255)
+YELLOW = (255, 255, 0)
+DARK = (30, 30, 30)
+
+# 小地图参数
+MINIMAP_SCALE = 0.25
+MINIMAP_MARGIN = 10
+
+# 迷雾视野
+VISION_RADIUS = 2
+VISION_SHADOWCAST = False  # 为 True 时墙会遮挡视线（对称阴影投射）
+
+# 材质加载
+TEXTURE_CACHE_DIR = "temp_textures"  # 远程材质的磁盘缓存目录
+TEXTURE_CACHE_BYTES = 64 * 1024 * 1024  # 磁盘缓存上限，超过后淘汰最久未用的文件
+TEXTURE_WORKERS = 4  # 下载线程数
+TEXTURE_TIMEOUT = 10  # 单次下载超时（秒）
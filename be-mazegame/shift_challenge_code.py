@@ -11,18 +11,18 @@ def run(self):
     while running:
         # 获取当前位置和可见区域等信息
         px, py = self.player.get_pos()
-        visible = get_visible(self.maze, px, py, VISION_RADIUS)
-        self.minimap_memory.update(visible)
+        if self.vision.update(px, py):
+            self.minimap_memory.update(self.vision.cells())
+            self.minimap.reveal(self.vision.cells())
 
         # 检查小球收集
-        for (bx, by), num in self.balls[:]:
-            if (px, py) == (bx, by):
-                self.player.collected.append(num)
-                self.balls.remove(((bx, by), num))
-                print(f"收集到小球: {num}")
+        num = self.balls.take(px, py)
+        if num is not None:
+            self.player.collected.append(num)
+            print(f"收集到小球: {num}")
 
         # 死角事件处理 - 添加Shift键挑战
-        if (px, py) in find_dead_ends(self.maze) and (px, py) not in self.event_triggered:
+        if self.topology.is_dead_end(px, py) and (px, py) not in self.event_triggered:
             self.event_triggered.add((px, py))
             # 启动shift按键挑战
             print(f"死角事件触发: 位置({px},{py})! 请在3秒内连续按击20次shift键!")
@@ -0,0 +1,149 @@
+"""批量模拟：在多进程池中无界面地跑 N 局，用于调整关卡参数
+
+用法示例：
+    python simulate.py -n 1000 --agent greedy --width 61 --height 41 --vision-radius 3
+    python simulate.py -n 500 --agent random --max-time 120 --csv runs.csv
+"""
+import argparse
+import csv
+import multiprocessing
+import random
+import sys
+import time
+from array import array
+
+from agents import AGENTS
+from game_state import GameState, Rules
+from settings import (
+    MAZE_WIDTH, MAZE_HEIGHT, VISION_RADIUS, MOVE_COOLDOWN, BALL_PICKUP_REFRESH_INTERVAL,
+    SHIFT_CHALLENGE_TIME, SHIFT_CHALLENGE_PRESSES,
+)
+
+# 每局结果的列；finished/died 为 0/1，时间单位毫秒
+COLUMNS = ("seed", "finished", "died", "time_ms", "steps", "balls", "challenges", "path_len")
+
+
+def run_session(job):
+    """跑一局，直到通过第一关、死亡或超时；返回与 COLUMNS 对应的一行"""
+    seed, agent_name, rules, dt, max_time = job
+    state = GameState(log=None, rules=rules, seed=seed)
+    agent = AGENTS[agent_name](random.Random(seed ^ 0x5EED))
+    path_len = len(state.path) - 1
+    steps = balls = challenges = 0
+    finished = False
+    while state.running and state.time < max_time:
+        events = state.step(agent.act(state), dt)
+        steps += 1
+        for name, _ in events:
+            if name == "ball":
+                balls += 1
+            elif name == "challenge":
+                challenges += 1
+            elif name == "completed":
+                finished = True
+        if finished:
+            break
+    return (seed, int(finished), int(not state.running), state.time, steps, balls, challenges, path_len)
+
+
+class Columns:
+    """按列累积结果，每列一个 array，便于汇总统计"""
+
+    def __init__(self, names):
+        self.names = names
+        self.data = {name: array("q") for name in names}
+
+    def append(self, row):
+        for name, value in zip(self.names, row):
+            self.data[name].append(value)
+
+    def __len__(self):
+        return len(self.data[self.names[0]])
+
+    def summary(self, name, where=None):
+        """某一列的 (均值, p50, p90, 最小, 最大)；where 为同长度的 0/1 列，只统计为 1 的行"""
+        values = self.data[name]
+        if where is not None:
+            values = [v for v, keep in zip(values, self.data[where]) if keep]
+        if not values:
+            return None
+        ordered = sorted(values)
+        n = len(ordered)
+        return (sum(ordered) / n, ordered[n // 2], ordered[min(n - 1, n * 9 // 10)], ordered[0], ordered[-1])
+
+
+def print_summary(columns, elapsed, out=sys.stdout):
+    n = len(columns)
+    finished = sum(columns.data["finished"])
+    died = sum(columns.data["died"])
+    out.write(f"\n{n} 局，用时 {elapsed:.1f}s（{n / max(elapsed, 1e-9):.0f} 局/秒）"
+              f"；通关 {finished}（{finished / max(n, 1):.0%}），死亡 {died}\n")
+    out.write(f"{'列':<16}{'均值':>10}{'p50':>10}{'p90':>10}{'最小':>10}{'最大':>10}\n")
+    rows = [("time_ms(通关)", "time_ms", "finished"), ("steps", "steps", None), ("balls", "balls", None),
+            ("challenges", "challenges", None), ("path_len", "path_len", None)]
+    for label, name, where in rows:
+        stats = columns.summary(name, where)
+        if stats is None:
+            out.write(f"{label:<16}{'-':>10}\n")
+            continue
+        mean, p50, p90, lo, hi = stats
+        out.write(f"{label:<16}{mean:>10.1f}{p50:>10}{p90:>10}{lo:>10}{hi:>10}\n")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="无界面批量模拟迷宫关卡")
+    parser.add_argument("-n", "--runs", type=int, default=200, help="模拟局数")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="进程数，默认 CPU 核数")
+    parser.add_argument("--agent", choices=sorted(AGENTS), default="greedy")
+    parser.add_argument("--seed", type=int, default=0, help="第 i 局使用种子 seed+i")
+    parser.add_argument("--dt", type=int, default=33, help="每步的模拟时长（毫秒）")
+    parser.add_argument("--max-time", type=float, default=600, help="每局最长模拟时间（秒）")
+    parser.add_argument("--width", type=int, default=MAZE_WIDTH)
+    parser.add_argument("--height", type=int, default=MAZE_HEIGHT)
+    parser.add_argument("--vision-radius", type=int, default=VISION_RADIUS)
+    parser.add_argument("--move-cooldown", type=int, default=MOVE_COOLDOWN)
+    parser.add_argument("--pickup-refresh", type=int, default=BALL_PICKUP_REFRESH_INTERVAL,
+                        help="首次完成后拾球到补球的间隔（毫秒）")
+    parser.add_argument("--challenge-time", type=int, default=SHIFT_CHALLENGE_TIME)
+    parser.add_argument("--challenge-presses", type=int, default=SHIFT_CHALLENGE_PRESSES)
+    parser.add_argument("--csv", help="逐局结果写入 CSV 文件")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    rules = Rules(width=args.width, height=args.height, vision_radius=args.vision_radius,
+                  move_cooldown=args.move_cooldown, pickup_refresh_interval=args.pickup_refresh,
+                  challenge_time=args.challenge_time, challenge_presses=args.challenge_presses)
+    max_time = int(args.max_time * 1000)
+    jobs = [(args.seed + i, args.agent, rules, args.dt, max_time) for i in range(args.runs)]
+
+    columns = Columns(COLUMNS)
+    csv_file = open(args.csv, "w", newline="") if args.csv else None
+    writer = csv.writer(csv_file) if csv_file else None
+    if writer:
+        writer.writerow(COLUMNS)
+
+    processes = args.jobs or multiprocessing.cpu_count()
+    chunksize = max(1, args.runs // (processes * 8))
+    started = time.perf_counter()
+    try:
+        with multiprocessing.Pool(processes) as pool:
+            # 结果一到就写入，不等全部跑完
+            for row in pool.imap_unordered(run_session, jobs, chunksize):
+                columns.append(row)
+                if writer:
+                    writer.writerow(row)
+                done = len(columns)
+                if done % max(1, args.runs // 20) == 0:
+                    sys.stderr.write(f"\r{done}/{args.runs}")
+    finally:
+        if csv_file:
+            csv_file.close()
+    sys.stderr.write("\n")
+    print_summary(columns, time.perf_counter() - started)
+    return columns
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+from collections import OrderedDict
+
+import pygame
+
+# 缓存的缩放精灵数上限，超过后按最近最少使用淘汰
+SPRITE_CACHE_SIZE = 64
+
+_sprites = OrderedDict()
+
+
+def _remember(key, sprite):
+    _sprites[key] = sprite
+    if len(_sprites) > SPRITE_CACHE_SIZE:
+        _sprites.popitem(last=False)
+    return sprite
+
+
+def scaled_sprite(texture, size, alpha=None):
+    """把材质缩放到 size，alpha 不为 None 时整体半透明；按 (texture, size, alpha) 缓存"""
+    key = (texture, tuple(size), alpha)
+    sprite = _sprites.get(key)
+    if sprite is not None:
+        _sprites.move_to_end(key)
+        return sprite
+    sprite = texture if texture.get_size() == key[1] else pygame.transform.scale(texture, key[1])
+    if alpha is not None:
+        sprite = sprite.convert_alpha() if pygame.display.get_surface() else sprite.copy()
+        sprite.fill((255, 255, 255, alpha), special_flags=pygame.BLEND_RGBA_MULT)
+    return _remember(key, sprite)
+
+
+def filled_sprite(size, color):
+    """纯色（可带 alpha）矩形精灵，按 (color, size) 缓存"""
+    key = (tuple(color), tuple(size), None)
+    sprite = _sprites.get(key)
+    if sprite is not None:
+        _sprites.move_to_end(key)
+        return sprite
+    sprite = pygame.Surface(key[1], pygame.SRCALPHA)
+    sprite.fill(key[0])
+    return _remember(key, sprite)
+
+
+def clear():
+    _sprites.clear()
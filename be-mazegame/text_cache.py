@@ -0,0 +1,73 @@
+from collections import OrderedDict
+
+import pygame
+
+from settings import CELL_SIZE, BLUE, YELLOW
+
+# 渲染结果缓存的最大条目数，超过后按最近最少使用淘汰
+TEXT_CACHE_SIZE = 256
+
+_fonts = {}
+_texts = OrderedDict()
+_ball_sprites = OrderedDict()
+
+
+def get_font(name=None, size=24):
+    """按 (name, size) 缓存的系统字体，每种字体只创建一次"""
+    key = (name, size)
+    font = _fonts.get(key)
+    if font is None:
+        font = _fonts[key] = pygame.font.SysFont(name, size)
+    return font
+
+
+def _display_format(surface):
+    """已设置显示模式时转换为显示格式（带 alpha），之后 blit 不再需要逐像素转换格式"""
+    if pygame.display.get_surface() is None:
+        return surface
+    return surface.convert_alpha()
+
+
+def render_text(text, color, size=24, name=None, antialias=True):
+    """渲染文字并缓存结果表面；同一字体下按 (text, color) 复用，LRU 淘汰"""
+    key = (name, size, antialias, text, color)
+    surface = _texts.get(key)
+    if surface is not None:
+        _texts.move_to_end(key)
+        return surface
+    surface = _texts[key] = _display_format(get_font(name, size).render(text, antialias, color))
+    if len(_texts) > TEXT_CACHE_SIZE:
+        _texts.popitem(last=False)
+    return surface
+
+
+def ball_sprite(num, texture=None):
+    """带数字的小球贴图（一个格子大小）：材质或黄色圆加上蓝色数字，按 (num, texture) 缓存"""
+    key = (num, texture)
+    sprite = _ball_sprites.get(key)
+    if sprite is not None:
+        _ball_sprites.move_to_end(key)
+        return sprite
+    sprite = pygame.Surface((CELL_SIZE, CELL_SIZE), pygame.SRCALPHA)
+    center = (CELL_SIZE//2, CELL_SIZE//2)
+    if texture:
+        sprite.blit(texture, (0, 0))
+    else:
+        pygame.draw.circle(sprite, YELLOW, center, CELL_SIZE//3)
+    sprite.blit(render_text(str(num), BLUE, 24), (center[0]-8, center[1]-12))
+    sprite = _ball_sprites[key] = _display_format(sprite)
+    if len(_ball_sprites) > TEXT_CACHE_SIZE:
+        _ball_sprites.popitem(last=False)
+    return sprite
+
+
+def prerender_balls(texture=None, numbers=(1, 2, 3, 4)):
+    """预先生成 1~4 号小球贴图，避免第一次出现时卡顿"""
+    for num in numbers:
+        ball_sprite(num, texture)
+
+
+def clear():
+    """清空所有缓存（字体除外）"""
+    _texts.clear()
+    _ball_sprites.clear()
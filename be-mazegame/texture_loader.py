@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import pygame
+
+from settings import TEXTURE_CACHE_DIR, TEXTURE_CACHE_BYTES, TEXTURE_WORKERS, TEXTURE_TIMEOUT
+
+
+class DiskCache:
+    """远程材质的磁盘缓存：文件名为 URL 的 SHA-256 摘要，旁边的 .json 记录 ETag 和 Last-Modified
+
+    命中缓存时带条件请求重新验证，服务器返回 304 就直接用本地文件；网络不可用时也退回本地文件。
+    总大小超过 max_bytes 时按最近使用时间淘汰。
+    """
+
+    def __init__(self, directory=TEXTURE_CACHE_DIR, max_bytes=TEXTURE_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+
+    def path_for(self, url):
+        """URL 对应的缓存文件路径，保留原扩展名以便 pygame 识别格式"""
+        digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        ext = os.path.splitext(urlparse(url).path)[1].lower()
+        if not ext or len(ext) > 5:
+            ext = ".png"
+        return os.path.join(self.directory, digest + ext)
+
+    def _meta_path(self, path):
+        return os.path.splitext(path)[0] + ".json"
+
+    def _read_meta(self, path):
+        try:
+            with open(self._meta_path(path), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def fetch(self, url, timeout=TEXTURE_TIMEOUT):
+        """返回 URL 内容的本地文件路径，必要时下载或重新验证"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path_for(url)
+        cached = os.path.isfile(path)
+        meta = self._read_meta(path) if cached else {}
+
+        request = urllib.request.Request(url)
+        if meta.get("etag"):
+            request.add_header("If-None-Match", meta["etag"])
+        if meta.get("last_modified"):
+            request.add_header("If-Modified-Since", meta["last_modified"])
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".part")
+                try:
+                    with os.fdopen(fd, "wb") as f:
+                        while True:
+                            chunk = response.read(64 * 1024)
+                            if not chunk:
+                                break
+                            f.write(chunk)
+                    os.replace(tmp, path)
+                except BaseException:
+                    os.unlink(tmp)
+                    raise
+                meta = {"url": url,
+                        "etag": response.headers.get("ETag"),
+                        "last_modified": response.headers.get("Last-Modified")}
+            with open(self._meta_path(path), "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+        except urllib.error.HTTPError as e:
+            if not (e.code == 304 and cached):
+                raise
+            os.utime(path)  # 304：本地文件仍然有效
+        except OSError:
+            if not cached:
+                raise
+            # 网络不可用，退回到本地缓存
+        self.trim(keep=path)
+        return path
+
+    def size(self):
+        """缓存目录中材质文件的总字节数"""
+        return sum(os.path.getsize(p) for p in self._files())
+
+    def _files(self):
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        return [os.path.join(self.directory, n) for n in names
+                if not n.endswith((".json", ".part"))]
+
+    def trim(self, keep=None):
+        """按最近使用时间淘汰文件，直到总大小不超过上限；keep 指定的文件不会被淘汰"""
+        with self.lock:
+            files = []
+            for p in self._files():
+                try:
+                    st = os.stat(p)
+                except OSError:
+                    continue
+                files.append((st.st_mtime, st.st_size, p))
+            total = sum(size for _, size, _ in files)
+            files.sort()
+            for _, size, p in files:
+                if total <= self.max_bytes:
+                    break
+                if p == keep:
+                    continue
+                for victim in (p, self._meta_path(p)):
+                    try:
+                        os.unlink(victim)
+                    except OSError:
+                        pass
+                total -= size
+
+
+class TextureLoader:
+    """后台线程加载材质：load 立即返回（已缓存的材质或占位值），加载完成后在 poll 中回调换上真实表面
+
+    本地文件直接同步加载；远程 URL 经 DiskCache 下载，解码和缩放都在工作线程完成。
+    回调只在调用 poll 的线程（主循环）里执行。
+    """
+
+    def __init__(self, cache=None, workers=TEXTURE_WORKERS):
+        self.cache = cache if cache is not None else DiskCache()
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.surfaces = {}
+        # (url, size) -> [future, 回调列表]
+        self.pending = {}
+
+    def load(self, url, size=None, on_ready=None, placeholder=None):
+        """请求一张材质；已就绪则直接返回表面，否则返回 placeholder，加载成功后调用 on_ready(surface)"""
+        key = (url, size)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            return surface
+        if os.path.isfile(url):
+            try:
+                surface = self.surfaces[key] = self._decode(url, size)
+                return surface
+            except pygame.error as e:
+                print(f"无法加载材质 {url}: {e}")
+                return placeholder
+        entry = self.pending.get(key)
+        if entry is None:
+            entry = self.pending[key] = [self.pool.submit(self._fetch, url, size), []]
+        if on_ready is not None:
+            entry[1].append(on_ready)
+        return placeholder
+
+    def _fetch(self, url, size):
+        return self._decode(self.cache.fetch(url), size)
+
+    def _decode(self, path, size):
+        texture = pygame.image.load(path)
+        if size:
+            texture = pygame.transform.scale(texture, size)
+        return texture
+
+    def poll(self):
+        """把已完成的加载结果交给回调，返回本次处理完的请求数"""
+        done = [key for key, (future, _) in self.pending.items() if future.done()]
+        for key in done:
+            future, callbacks = self.pending.pop(key)
+            try:
+                surface = future.result()
+            except Exception as e:
+                print(f"无法加载材质 {key[0]}: {e}")
+                continue
+            self.surfaces[key] = surface
+            for callback in callbacks:
+                callback(surface)
+        return len(done)
+
+    def wait(self, timeout=None):
+        """阻塞到当前所有请求完成（无界面运行和测试用），然后执行回调"""
+        for future, _ in list(self.pending.values()):
+            try:
+                future.result(timeout)
+            except Exception:
+                pass
+        return self.poll()
+
+    def busy(self):
+        return bool(self.pending)
+
+    def shutdown(self):
+        """丢弃尚未开始的下载，不等待正在进行的请求"""
+        self.pool.shutdown(wait=False, cancel_futures=True)
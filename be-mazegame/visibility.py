@@ -0,0 +1,91 @@
+import math
+from fractions import Fraction
+
+
+class VisibilityMask:
+    """迷雾视野：只在玩家所在格变化时重新计算
+
+    默认视野是以玩家为中心、边长 2*radius+1 的正方形（与原 get_visible 一致）；
+    shadowcast 为 True 时使用对称阴影投射，墙会遮挡视线，墙本身可见。
+    只保存可见格子的集合，更新和查询的开销只与视野大小有关，与迷宫大小无关。
+    """
+
+    def __init__(self, maze, radius, shadowcast=False):
+        self.maze = maze
+        self.radius = radius
+        self.shadowcast = shadowcast
+        self.origin = None
+        self._cells = []
+        self._visible = frozenset()
+
+    def update(self, px, py):
+        """玩家位于 (px, py)；视野有变化时重新计算并返回 True"""
+        if self.origin == (px, py):
+            return False
+        self.origin = (px, py)
+        if self.shadowcast:
+            cells = self._shadowcast(px, py)
+        else:
+            cells = self._square(px, py)
+        self._cells = cells
+        self._visible = frozenset(cells)
+        return True
+
+    def is_visible(self, x, y):
+        return (x, y) in self._visible
+
+    def cells(self):
+        """当前可见的所有格子坐标"""
+        return self._cells
+
+    def _square(self, px, py):
+        w, h, r = self.maze.width, self.maze.height, self.radius
+        x0, x1 = max(px - r, 0), min(px + r, w - 1)
+        y0, y1 = max(py - r, 0), min(py + r, h - 1)
+        if x0 > x1 or y0 > y1:
+            return []
+        return [(x, y) for y in range(y0, y1 + 1) for x in range(x0, x1 + 1)]
+
+    def _shadowcast(self, px, py):
+        """对称阴影投射（按四个象限逐行扫描，用斜率区间记录未被遮挡的部分）"""
+        maze, radius = self.maze, self.radius
+        seen = set()
+
+        def reveal(x, y):
+            if maze.in_bounds(x, y):
+                seen.add((x, y))
+
+        if not maze.in_bounds(px, py):
+            return []
+        reveal(px, py)
+        transforms = (
+            lambda d, c: (px + c, py - d),  # 北
+            lambda d, c: (px + d, py + c),  # 东
+            lambda d, c: (px + c, py + d),  # 南
+            lambda d, c: (px - d, py + c),  # 西
+        )
+        for transform in transforms:
+            def blocked(d, c):
+                x, y = transform(d, c)
+                return not maze.is_path(x, y)
+
+            rows = [(1, Fraction(-1), Fraction(1))]
+            while rows:
+                depth, start, end = rows.pop()
+                if depth > radius:
+                    continue
+                prev = None  # 上一格是否是墙，None 表示这是本行第一格
+                lo = math.floor(depth*start + Fraction(1, 2))
+                hi = math.ceil(depth*end - Fraction(1, 2))
+                for col in range(lo, hi + 1):
+                    wall = blocked(depth, col)
+                    if wall or depth*start <= col <= depth*end:
+                        reveal(*transform(depth, col))
+                    if prev is True and not wall:
+                        start = Fraction(2*col - 1, 2*depth)
+                    if prev is False and wall:
+                        rows.append((depth + 1, start, Fraction(2*col - 1, 2*depth)))
+                    prev = wall
+                if prev is False:
+                    rows.append((depth + 1, start, end))
+        return list(seen)
@@ -36,6 +36,9 @@ floor_image=pygame.transform.scale(floor_image, (CELL_SIZE, CELL_SIZE))
 # 创建迷雾层
 fog_surface = pygame.Surface(WINDOW_SIZE, pygame.SRCALPHA)
 VISION_RADIUS = 3  # 可视范围半径（以格子为单位）
+# 密码输入界面的字体和提示文字，只创建一次
+input_font = pygame.font.Font(None, 36)
+prompt_surface = input_font.render("请输入4位密码:", True, WHITE)
 
 class Player:
     def __init__(self, x, y):
@@ -70,6 +73,7 @@ class Player:
         # 视野中心点
         self.vision_center_x = self.visual_x + self.size // 2
         self.vision_center_y = self.visual_y + self.size // 2
+        self.fog_center = None  # 上次绘制迷雾时的视野中心
     
     def try_move(self, dx, dy, maze):
         new_x = self.x + dx
@@ -136,6 +140,12 @@ class Player:
     
 
     def update_vision(self):
+        # 视野中心没有移动时沿用上一帧的迷雾
+        center = (self.vision_center_x, self.vision_center_y)
+        if center == self.fog_center:
+            return
+        self.fog_center = center
+
         # 更新迷雾效果
         fog_surface.fill((30, 30, 30, 255))
         
@@ -216,10 +226,20 @@ def create_maze():
         maze[y][0] = 1
         maze[y][GRID_WIDTH-1] = 1
     
-    def divide(x1, y1, x2, y2):
+    for _ in create_maze_steps(maze):
+        pass
+    return maze
+
+# 分段挖迷宫：每分割一个区域产出一次，可以暂停、下一帧接着挖
+def create_maze_steps(maze):
+    # 用显式栈代替递归，大网格不会触发递归深度限制
+    # 子区域按 左上、右上、左下、右下 的逆序入栈，出栈顺序与原递归一致
+    stack = [(1, 1, GRID_WIDTH - 2, GRID_HEIGHT - 2)]
+    while stack:
+        x1, y1, x2, y2 = stack.pop()
         # 如果区域太小，就不再分割
         if x2 - x1 < 2 or y2 - y1 < 2:
-            return
+            continue
         
         # 随机选择一个点作为分割点
         wall_x = random.randint(x1 + 1, x2 - 1)
@@ -248,14 +268,12 @@ def create_maze():
         for hole_x, hole_y in holes:
             maze[hole_y][hole_x] = 0
         
-        # 递归处理四个象限
-        divide(x1, y1, wall_x - 1, wall_y - 1)  # 左上
-        divide(wall_x + 1, y1, x2, wall_y - 1)  # 右上
-        divide(x1, wall_y + 1, wall_x - 1, y2)  # 左下
-        divide(wall_x + 1, wall_y + 1, x2, y2)  # 右下
-    
-    # 从整个迷宫开始递归分割
-    divide(1, 1, GRID_WIDTH - 2, GRID_HEIGHT - 2)
+        # 处理四个象限
+        stack.append((wall_x + 1, wall_y + 1, x2, y2))  # 右下
+        stack.append((x1, wall_y + 1, wall_x - 1, y2))  # 左下
+        stack.append((wall_x + 1, y1, x2, wall_y - 1))  # 右上
+        stack.append((x1, y1, wall_x - 1, wall_y - 1))  # 左上
+        yield
     
     # 确保起点和终点可达
     maze[1][1] = 0  # 起点
@@ -264,8 +282,6 @@ def create_maze():
     # 确保起点和终点周围有路
     maze[1][2] = maze[2][1] = 0  # 起点周围
     maze[GRID_HEIGHT-2][GRID_WIDTH-3] = maze[GRID_HEIGHT-3][GRID_WIDTH-2] = 0  # 终点周围
-    
-    return maze
 
 # 生成物品
 def create_items():
@@ -287,6 +303,15 @@ def create_items():
 
 # 创建迷宫和游戏对象
 maze = create_maze()
+
+# 地板和墙壁不会变化，预先烘焙到一张表面上，每帧只需一次 blit
+maze_surface = pygame.Surface(WINDOW_SIZE).convert()
+for y in range(GRID_HEIGHT):
+    for x in range(GRID_WIDTH):
+        if maze[y][x] == 1:
+            maze_surface.blit(wall_image, (x * CELL_SIZE, y * CELL_SIZE))
+        if maze[y][x] == 0:
+            maze_surface.blit(floor_image, (x * CELL_SIZE, y * CELL_SIZE))
 player = Player(1, 1)
 items = create_items()
 
@@ -437,8 +462,9 @@ while running:
     # 检查是否到达终点
     if (player.x == GRID_WIDTH-2 and player.y == GRID_HEIGHT-2):
         if player.progress >= 4:
-            input_font = pygame.font.Font(None, 36)
             input_text = "请输入密码"
+            text_surface = input_font.render(input_text, True, WHITE)
+            rendered_text = input_text
             password = "3719"
             input_active = True
             cursor_visible = True
@@ -478,8 +504,10 @@ while running:
                 pygame.draw.rect(screen, WHITE, input_box, 2)
                 
                 # 渲染文本
-                text_surface = input_font.render(input_text, True, WHITE)
-                prompt_surface = input_font.render("请输入4位密码:", True, WHITE)
+                # 输入内容变化时才重新渲染
+                if input_text != rendered_text:
+                    text_surface = input_font.render(input_text, True, WHITE)
+                    rendered_text = input_text
                 
                 # 显示提示文本和输入的文本
                 screen.blit(prompt_surface, (WINDOW_SIZE[0]//2 - 100, WINDOW_SIZE[1]//2 - 50))
@@ -504,12 +532,7 @@ while running:
     screen.fill(BLACK)
     
     # 绘制迷宫
-    for y in range(GRID_HEIGHT):
-        for x in range(GRID_WIDTH):
-            if maze[y][x] == 1:
-                screen.blit(wall_image, (x * CELL_SIZE, y * CELL_SIZE))
-            if maze[y][x] == 0:
-                screen.blit(floor_image, (x * CELL_SIZE, y * CELL_SIZE))
+    screen.blit(maze_surface, (0, 0))
     # 绘制物品
     for item in items:
         item.draw(screen)